@@ -0,0 +1,168 @@
+# Hot stock snapshots and zone change alerts
+# After every new bar the latest RSI and zone (oversold <low, overbought >high, else neutral)
+# of every ticker of a universe is saved as a small snapshot table. The new snapshot is compared
+# with the previous one and the changes are appended to an event log. The last bar is usually
+# still forming (e.g. today's daily bar), so its snapshot is saved again whenever its values
+# change and zone changes within the bar are logged as well:
+#   newly oversold     the ticker entered the oversold zone
+#   newly overbought   the ticker entered the overbought zone
+#   exited             the ticker left the oversold or overbought zone (see the From column)
+# The event log can be queried by date range, e.g.
+#   python alerts.py --universe sp500 --start 2026-10-01 --end 2026-10-18
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from price_store import CACHE_DIR
+from universes import UNIVERSES
+
+EVENT_COLUMNS = ['Date', 'Symbol', 'Event', 'From', 'To', 'RSI', 'Close']
+
+
+# Zone of every ticker from its current RSI (tickers without RSI are neutral)
+def zones(current_rsi, low=30, high=70):
+    zone = pd.Series('neutral', index=current_rsi.index, dtype=object)
+    zone[current_rsi < low] = 'oversold'
+    zone[current_rsi > high] = 'overbought'
+    return zone
+
+
+# Snapshot table of a universe: current RSI, last close and zone per ticker
+def zone_table(current_rsi, closes, low=30, high=70):
+    return pd.DataFrame({
+        'RSI': current_rsi,
+        'Close': closes.ffill().iloc[-1].reindex(current_rsi.index) if len(closes) else float('nan'),
+        'Zone': zones(current_rsi, low, high),
+    }, index=current_rsi.index.rename('Symbol'))
+
+
+# Hot list (see screener.hot_list) out of a snapshot table
+def hot_from_table(table):
+    hot = table[table['Zone'] != 'neutral']
+    return hot.rename(columns={'Zone': 'Signal'})[['RSI', 'Close', 'Signal']]
+
+
+# Zone changes between two snapshot tables, dated with the bar of the new snapshot
+# Tickers that are new in the universe count as neutral before
+def zone_events(previous, current, bar):
+    before = previous['Zone'].reindex(current.index).fillna('neutral')
+    changed = current[before != current['Zone']]
+    before = before[changed.index]
+    event = ['exited' if zone == 'neutral' else f'newly {zone}' for zone in changed['Zone']]
+    return pd.DataFrame({'Date': pd.Timestamp(bar), 'Symbol': changed.index, 'Event': event,
+                         'From': before.to_numpy(), 'To': changed['Zone'].to_numpy(),
+                         'RSI': changed['RSI'].to_numpy(), 'Close': changed['Close'].to_numpy()},
+                        columns=EVENT_COLUMNS)
+
+
+# Snapshot tables and event logs on disk, one per universe and interval:
+#   hot_<universe>_<interval>.parquet      latest snapshot table
+#   hot_<universe>_<interval>.json         bar and RSI settings of the snapshot
+#   events_<universe>_<interval>.csv       event log (only ever appended to)
+class AlertStore:
+    def __init__(self, root=os.path.join(CACHE_DIR, 'alerts')):
+        self.root = root
+
+    # Universe files (see universes.load_universe_file) are named after the file
+    def _path(self, kind, universe, interval, extension):
+        name = os.path.splitext(os.path.basename(universe))[0]
+        return os.path.join(self.root, f'{kind}_{name}_{interval}.{extension}')
+
+    # Latest snapshot table and its settings ({'bar', 'time_window', 'low', 'high'}), or (None, None)
+    def latest(self, universe, interval='1d'):
+        path = self._path('hot', universe, interval, 'parquet')
+        if not os.path.exists(path):
+            return None, None
+        with open(self._path('hot', universe, interval, 'json')) as f:
+            return pd.read_parquet(path), json.load(f)
+
+    # Save the snapshot table of a new bar, or of the last bar when its values changed, and append
+    # its zone changes to the event log
+    # Returns the new events (none for the first snapshot or after the settings changed)
+    def record(self, universe, table, bar, time_window=14, low=30, high=70, interval='1d'):
+        meta = _meta(bar, time_window, low, high)
+        events = pd.DataFrame(columns=EVENT_COLUMNS)
+        previous, previous_meta = self.latest(universe, interval)
+        if previous is not None and _settings(previous_meta) == _settings(meta):
+            last_bar = pd.Timestamp(previous_meta['bar'])
+            if last_bar > pd.Timestamp(bar):
+                return events  # a newer bar was already recorded
+            if last_bar == pd.Timestamp(bar) and _same_table(previous, table):
+                return events  # nothing changed since this bar was recorded
+            events = zone_events(previous, table, bar)
+        os.makedirs(self.root, exist_ok=True)
+        log = self._path('events', universe, interval, 'csv')
+        if len(events):
+            events.to_csv(log, mode='a', header=not os.path.exists(log), index=False)
+        # write to temporary files first so that a crash never leaves a half written snapshot
+        path = self._path('hot', universe, interval, 'parquet')
+        table.to_parquet(path + '.tmp')
+        os.replace(path + '.tmp', path)
+        meta_path = self._path('hot', universe, interval, 'json')
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(meta_path + '.tmp', meta_path)
+        return events
+
+    # Events of the log between start and end (both included, dates or timestamps)
+    def events(self, universe, start=None, end=None, interval='1d'):
+        log = self._path('events', universe, interval, 'csv')
+        if not os.path.exists(log):
+            return pd.DataFrame(columns=EVENT_COLUMNS)
+        events = pd.read_csv(log, parse_dates=['Date'])
+        if start is not None:
+            events = events[events['Date'] >= pd.Timestamp(start)]
+        if end is not None:
+            end = pd.Timestamp(end)
+            if end == end.normalize():
+                end += pd.Timedelta(days=1) - pd.Timedelta(1)  # a date includes all bars of that day
+            events = events[events['Date'] <= end]
+        return events.reset_index(drop=True)
+
+
+def _meta(bar, time_window, low, high):
+    return {'bar': pd.Timestamp(bar).isoformat(), 'time_window': time_window, 'low': low, 'high': high}
+
+
+# Same tickers, zones, RSI and closes (up to float rounding of the saved file)
+def _same_table(previous, table):
+    if not previous.index.equals(table.index):
+        return False
+    # compared by value, the saved zones read back with a string dtype
+    if (previous['Zone'].to_numpy(dtype=object) != table['Zone'].to_numpy(dtype=object)).any():
+        return False
+    return all(np.allclose(previous[column].to_numpy(dtype=float), table[column].to_numpy(dtype=float),
+                           rtol=0, atol=1e-9, equal_nan=True) for column in ['RSI', 'Close'])
+
+
+def _settings(meta):
+    return {key: value for key, value in meta.items() if key != 'bar'}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Show the zone changes (newly oversold/overbought, exited) of a universe")
+    parser.add_argument('--universe', default='sp100', help=f"one of {', '.join(UNIVERSES)} (or a universe file)")
+    parser.add_argument('--interval', default='1d', help="bar interval (default: 1d)")
+    parser.add_argument('--start', help="first date, e.g. 2026-10-01 (default: the whole log)")
+    parser.add_argument('--end', help="last date (default: the whole log)")
+    parser.add_argument('--event', choices=['newly oversold', 'newly overbought', 'exited'],
+                        help="only this kind of event")
+    parser.add_argument('--cache', help="folder of the local price store (the alerts are kept in its alerts folder)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    store = AlertStore(os.path.join(args.cache, 'alerts')) if args.cache else AlertStore()
+    events = store.events(args.universe, args.start, args.end, args.interval)
+    if args.event:
+        events = events[events['Event'] == args.event]
+    events.to_csv(sys.stdout, index=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+# %%
+# Trading Suggestion App for any universe of the registry (see universes.py)
+# Hot_Stocks.py (S&P 100) and SP500.py (S&P 500) only call main() with their universe, started
+# as `streamlit run app.py` the universe is selected in the sidebar. The S&P 100 is part of the
+# S&P 500, so both are served from the same prices and RSI of the data service (see
+# data_service.py): switching the universe only filters results that are already computed.
+
+# Chapter 0: Import packages
+import time
+from functools import partial
+
+import streamlit as st
+import pandas as pd
+from alerts import hot_from_table
+from data_service import get_service
+from exports import EXPORTS, FORMATS, export_file, file_name
+from charts import rsi_figure, page_of, page_count, bar_label, chart_ranges, sector_heatmap
+from cross_section import MEASURES
+from intraday import INTERVALS
+from profiling import Profiler
+from rsi_index import WINDOWS
+from universes import UNIVERSES, load_universe, name_column
+
+
+# Chapter 1: Preliminary steps to create the app
+# Set page layout, title and description (markdown)
+def show_description(universe):
+    info = UNIVERSES[universe]
+    st.title("Trading Suggestion App")
+    st.markdown(f"""
+This app retrieves the list of the **{info['title']}** (from Wikipedia) and shows the current **Hot Stocks** based on the **Relative Strength Index**.
+* **Python libraries:** streamlit, pandas, yfinance, plotly, pyarrow
+* **{info['title']} Data Source:** [Wikipedia]({info['url']}).
+* The RSI is a measurement used by traders to assess the price momentum of a stock.
+* Stocks are considered **hot** when their **current RSI** is either **<30** (=oversold) or **>70** (=overbought).
+* Some traders consider it a **buy signal** when the RSI is **<30** and a **sell signal** when the RSI is **>70**.
+* The button **GET ALL HOT STOCKS** will show all stocks of the {info['title']} that are **currently hot**.
+* **Theory on Relative Strength Index Indicator (RSI):** [Wikipedia](https://en.wikipedia.org/wiki/Relative_strength_index).
+""")
+
+
+# First paint: when the data service has no data yet (e.g. after a restart), the hot stocks of the last
+# saved snapshot (see alerts.py) are shown while the newest prices are loaded in the background
+def load_snapshot(service, universe, interval, snapshot, start):
+    if snapshot is not None:
+        return snapshot, ("warm", time.perf_counter() - start)
+    first_paint = ("cold", time.perf_counter() - start)
+    saved, saved_meta = service.alerts.latest(universe, interval)
+    loading = st.empty()
+    with loading.container():
+        if saved is not None:
+            st.write('Hot stocks of the last saved data (' + saved_meta['bar'] + '), updating...')
+            st.dataframe(hot_from_table(saved))
+        progress = st.progress(0.0, text="Loading the newest prices...")
+    future = service.submit(universe, interval)
+    while not future.done():
+        share, step = service.progress(universe, interval)
+        progress.progress(share, text="Loading the newest prices... " + (f"({step})" if step else ""))
+        time.sleep(0.2)
+    loading.empty()
+    return future.result(), first_paint
+
+
+# Download the data: the companies, prices, RSI or hot stocks as CSV, Parquet or Arrow IPC file
+# The file is only written when the button is clicked and then in chunks (see exports.py)
+def show_downloads(snapshot, universe, interval):
+    with st.expander("Download the data"):
+        export = st.selectbox("Data", EXPORTS)
+        export_format = st.selectbox("File format", list(FORMATS))
+        st.download_button("Download " + export_format + " File", partial(export_file, snapshot, export, export_format),
+                           file_name(universe, export, export_format, interval), FORMATS[export_format][1],
+                           on_click="ignore")
+
+
+# The zones of all companies are saved after every new bar, the companies that became oversold or
+# overbought or left these zones are logged (see alerts.py) and can be looked up for a date range
+def show_zone_changes(universe, interval, names):
+    with st.expander("Zone changes (newly oversold / newly overbought / exited)"):
+        today = pd.Timestamp.now().normalize()
+        dates = st.date_input("Show the zone changes between", ((today - pd.Timedelta(days=7)).date(), today.date()))
+        if len(dates) == 2:
+            events = get_service().alerts.events(universe, dates[0], dates[1], interval)
+            events.insert(2, 'Name', names.reindex(events['Symbol']).to_numpy())
+            st.write(str(len(events)) + ' zone changes')
+            st.dataframe(events)
+
+
+# Cross-sectional view: all companies ranked by their current RSI and the RSI per sector, computed once
+# per refresh for the whole universe by the data service (see cross_section.py)
+def show_cross_section(snapshot, universe, interval, names):
+    with st.expander("All companies ranked by RSI and RSI per sector"):
+        st.write("RSI per sector (last bar), breadth = share of companies with an RSI above 50 [%]")
+        st.dataframe(snapshot.sectors)
+        measure = st.selectbox("Sector measure over time", MEASURES)
+        st.plotly_chart(sector_heatmap(universe, interval, snapshot.sector_history, measure))
+        ranking = snapshot.ranking.copy()
+        ranking.insert(0, 'Name', names.reindex(ranking.index))
+        st.dataframe(ranking)
+
+
+# Chapter 4: Show the data in an user friendly way using scatter plots
+# Draw the Stock Price and RSI of a company with Date (YTD) on x-axes (see charts.py)
+def draw_chart(snapshot, ticker, name, interval, chart_range, window):
+    data = snapshot.prices
+    fig = rsi_figure(ticker, data.dates, data.column('Close', ticker), snapshot.rsi_index.get(ticker, window), name,
+                     f"{bar_label(interval)} Stock Price & RSI of {name}",
+                     interval=interval, chart_range=chart_range, window=window)
+    st.plotly_chart(fig)
+
+
+# Either all current hot companies or the company selected in the dropdown
+# All hot stocks are first shown in a compact table, the charts are only built for the page that is shown
+def draw_rsi(snapshot, names, all_companies, user_input, interval, chart_range, window):
+    if not all_companies:
+        draw_chart(snapshot, user_input, names.loc[user_input], interval, chart_range, window)
+        return
+    hot = snapshot.hot
+    if len(hot) == 0:  # if there are no hot stocks at the moment
+        st.write("Currently there are no hot stocks... Try again tomorrow!")
+        return
+    summary = hot.assign(Name=names.reindex(hot.index))[['Name', 'RSI', 'Close', 'Signal']]
+    summary = summary.rename(columns={'RSI': 'Last RSI', 'Close': 'Last Close', 'Signal': 'Direction'})
+    st.write(str(len(hot)) + ' hot stocks')
+    st.dataframe(summary)
+
+    sort_by = st.sidebar.selectbox("Sort hot stocks by", ["Symbol", "RSI (lowest first)", "RSI (highest first)"])
+    if sort_by == "Symbol":
+        tickers = hot.index.tolist()
+    else:
+        tickers = hot['RSI'].sort_values(ascending=sort_by == "RSI (lowest first)").index.tolist()
+    page_size = st.sidebar.number_input("Charts per page", min_value=1, max_value=50, value=5)
+    page = st.number_input("Page", min_value=1, max_value=page_count(tickers, page_size), value=1)
+    for ticker in page_of(tickers, page, page_size):
+        name = names.loc[str(ticker)]
+        with st.expander(f"{ticker} - {name}", expanded=True):
+            draw_chart(snapshot, str(ticker), name, interval, chart_range, window)
+
+
+# The app for one universe of the registry (None: selected in the sidebar)
+# start: time.perf_counter() at the start of the script, the time to the first paint is measured from it
+def main(universe=None, start=None):
+    start = time.perf_counter() if start is None else start
+    st.set_page_config(layout="wide")
+    # create a sidebar where we can take user inputs
+    st.sidebar.header('User Input Features')
+    if universe is None:
+        universe = st.sidebar.selectbox("Universe", list(UNIVERSES), format_func=lambda u: UNIVERSES[u]['title'])
+    title = UNIVERSES[universe]['title']
+    show_description(universe)
+
+    # Debug: time every stage of the app (see profiling.py), the timings are shown at the bottom of the sidebar
+    profiler = Profiler()
+    profiler.enabled = st.sidebar.checkbox("Show stage timings (debug)", value=profiler.enabled)
+    if profiler.enabled:
+        # tracemalloc slows down the app while it traces, so the peak memory is only measured on request
+        profiler.track_memory = st.sidebar.checkbox(
+            "Measure peak memory (slower)", value=profiler.track_memory,
+            help="The stages of the shared data refresh measure it with HOT_STOCKS_PROFILE=memory")
+
+    # load the data through webscraping the wikipedia page of the index and use already made table (see universes.py)
+    # The companies, their prices and RSI are loaded once for all sessions of the app by the shared
+    # data service (see data_service.py), which refreshes them in the background
+    # Besides the daily bars (YTD) intraday bars can be selected, of which only the most recent bars are kept
+    interval = st.sidebar.selectbox("Bar interval", list(INTERVALS))
+    # The charts show all bars or only the most recent ones, a shorter range is shown in more detail
+    chart_range = st.sidebar.selectbox("Chart range", chart_ranges(interval))
+    # The RSI of every company is precomputed for several windows (see rsi_index.py), the hot stocks use 14
+    window = st.sidebar.selectbox("RSI window of the charts", WINDOWS, index=WINDOWS.index(14))
+    service = get_service()
+    snapshot = service.cached(universe, interval)
+    # the companies come from the local snapshot of the table (see universes.py), so they are shown right away
+    sp_df = snapshot.constituents if snapshot is not None else load_universe(universe)
+
+    # Show overview of the companies
+    st.header('Companies in ' + title)
+    st.write('Data Dimension: ' + str(sp_df.shape[0]) + ' rows and ' + str(
+        sp_df.shape[1]) + ' columns.')
+    st.dataframe(sp_df)
+
+    with profiler.stage("data snapshot") as stage:
+        snapshot, first_paint = load_snapshot(service, universe, interval, snapshot, start)
+        stage.rows = len(snapshot.prices)
+    profiler.record(f"first paint ({first_paint[0]})", first_paint[1])
+    st.session_state.first_paint = first_paint
+    sp_df = snapshot.constituents
+    names = pd.Series(sp_df[name_column(universe)].to_numpy(), index=sp_df['Symbol'].astype(str))
+
+    # Sidebar - Company selection
+    def show_ticker():
+        st.session_state.show_hot_stocks = False
+
+    user_input = st.sidebar.selectbox(
+        f"Select a ticker from the {title} to check the stock and RSI development", sp_df, on_change=show_ticker)
+
+    # The hot stocks stay visible while paging through them, until another ticker is selected
+    if "show_hot_stocks" not in st.session_state:
+        st.session_state.show_hot_stocks = False
+    if st.sidebar.button("GET ALL HOT STOCKS"):
+        st.session_state.show_hot_stocks = True
+    all_companies = st.session_state.show_hot_stocks
+
+    show_downloads(snapshot, universe, interval)
+
+    # Chapter 2: Real-time stock data retrieve and RSI calculation
+    # Get YTD stock data in 1 day intervals (or the most recent intraday bars, see intraday.py) of all companies
+    # using yfinance library (https://pypi.org/project/yfinance/)
+    # The prices are cached on disk (see price_store.py), so only the newest bars are downloaded on a rerun
+    # and they are kept as a compact price panel with one array per field (see panel.py)
+    # e.g. intraday bars outside of the trading hours of the last days or no connection to Yahoo Finance
+    if len(snapshot.prices) == 0:
+        st.write(f"Currently there are no {interval} bars available... Try again later!")
+        st.stop()
+
+    # Chapter 3: GET ALL HOT STOCKS
+    # The data service computed the RSI of all companies in one pass: the full RSI matrix (dates x tickers),
+    # the current RSI per ticker and the hot list of all stocks whose current RSI is either <30 or >70
+    show_zone_changes(universe, interval, names)
+    show_cross_section(snapshot, universe, interval, names)
+
+    # Call the function
+    with profiler.stage("rendering"):
+        draw_rsi(snapshot, names, all_companies, user_input, interval, chart_range, window)
+
+    # Debug panel with the stage timings, which can be exported for the dashboards
+    if profiler.enabled:
+        with st.sidebar.expander("Stage timings", expanded=True):
+            st.dataframe(pd.DataFrame(profiler.records()))
+            st.write("Last data refresh (shared by all sessions)")
+            st.dataframe(pd.DataFrame(snapshot.timings))
+            st.write("RSI index of the snapshot")
+            st.json(snapshot.rsi_index.stats())
+            st.download_button("Download timings (JSON)", profiler.to_json(), "timings.json")
+            st.download_button("Download timings (Prometheus)", profiler.to_prometheus(), "timings.prom")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+# Backtest of the hot stock rule of Chapter 3
+# Replays the rule on every day of the price history for every ticker: an RSI <low is a buy
+# signal, an RSI >high is a sell signal. For each signal the forward return after 1/5/20 bars
+# is measured; a buy signal is a hit when the price went up, a sell signal when it went down.
+# Everything is computed on whole (dates x tickers) matrices, the only Python loops are over
+# the parameter combinations, e.g.
+#   python backtest.py --universe sp500 --period 10y --windows 7 14 21 --lows 20 25 30 --highs 70 75 80
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from indicators import IndicatorPipeline
+from price_store import PriceStore, FileSource, period_start
+from rsi import close_matrix
+from universes import load_universe
+
+HORIZONS = (1, 5, 20)
+
+
+# Return from the close of each day to the close `horizon` bars later (NaN at the end)
+def forward_returns(closes, horizon):
+    values = closes.to_numpy(dtype=float)
+    returns = np.full_like(values, np.nan)
+    if horizon < len(values):
+        returns[:-horizon] = values[horizon:] / values[:-horizon] - 1
+    return returns
+
+
+# Statistics of the forward returns of all signals in a boolean (dates x tickers) matrix
+def signal_stats(signals, returns, side):
+    values = returns[signals]
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return {'signals': 0, 'hit_rate': np.nan, 'mean_return': np.nan, 'median_return': np.nan}
+    hits = values > 0 if side == 'buy' else values < 0
+    return {'signals': len(values), 'hit_rate': hits.mean(), 'mean_return': values.mean(),
+            'median_return': np.median(values)}
+
+
+# Backtest of the RSI rule for all combinations of windows and thresholds
+# closes: close prices (dates x tickers); entries_only=True only counts the first day a
+# ticker enters the oversold/overbought zone instead of every day it stays there
+def backtest(closes, windows=(14,), lows=(30,), highs=(70,), horizons=HORIZONS, entries_only=False):
+    pipeline = IndicatorPipeline(closes)
+    returns = {horizon: forward_returns(closes, horizon) for horizon in horizons}
+    rows = []
+    for window in windows:
+        rsi = pipeline.rsi(window).to_numpy()
+        for side, thresholds, compare in [('buy', lows, np.less), ('sell', highs, np.greater)]:
+            for threshold in thresholds:
+                with np.errstate(invalid='ignore'):
+                    signals = compare(rsi, threshold)
+                if entries_only:
+                    signals[1:] &= ~signals[:-1]
+                for horizon in horizons:
+                    rows.append({'window': window, 'side': side, 'threshold': threshold, 'horizon': horizon,
+                                 **signal_stats(signals, returns[horizon], side)})
+    return pd.DataFrame(rows)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest the RSI oversold/overbought rule over a universe")
+    parser.add_argument('--universe', default='sp500', help="sp100, sp500 or a file with ticker symbols")
+    parser.add_argument('--period', default='10y', help="price history to replay, e.g. 5y, 10y, max (default: 10y)")
+    parser.add_argument('--windows', type=int, nargs='+', default=[14], help="RSI time windows (default: 14)")
+    parser.add_argument('--lows', type=float, nargs='+', default=[30], help="buy thresholds (default: 30)")
+    parser.add_argument('--highs', type=float, nargs='+', default=[70], help="sell thresholds (default: 70)")
+    parser.add_argument('--horizons', type=int, nargs='+', default=list(HORIZONS),
+                        help="forward return horizons in bars (default: 1 5 20)")
+    parser.add_argument('--entries-only', action='store_true',
+                        help="only count the first day a stock enters the zone")
+    parser.add_argument('--output', help="CSV file for the results (default: stdout)")
+    parser.add_argument('--cache', help="folder of the local price store")
+    parser.add_argument('--prices', help="read prices from this CSV/Parquet file instead of Yahoo Finance")
+    parser.add_argument('--offline', action='store_true', help="only use the cached prices")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    store_args = {}
+    if args.cache:
+        store_args['root'] = args.cache
+    if args.prices:
+        store_args['source'] = FileSource(args.prices)
+    store = PriceStore(**store_args)
+    symbols = load_universe(args.universe)['Symbol'].tolist()
+    data = store.load_panel(symbols, start=period_start(args.period), refresh=not args.offline)
+    results = backtest(close_matrix(data, symbols), args.windows, args.lows, args.highs,
+                       args.horizons, args.entries_only)
+    results.to_csv(args.output if args.output else sys.stdout, index=False)
+
+
+if __name__ == '__main__':
+    main()
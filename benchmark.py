@@ -0,0 +1,193 @@
+# Benchmarks of the hot paths with synthetic price data (no network needed)
+# For every panel size (tickers x bars) the following stages are timed:
+#   compute_rsi loop    Chapter 3 as it used to be: compute_rsi once per ticker
+#   compute_rsi_matrix  RSI of the whole universe in one pass
+#   hot stock screen    compute_rsi_matrix plus the hot list of Chapter 3
+#   cross section       RSI ranking and sector aggregates of the whole RSI matrix (11 sectors)
+#   draw_rsi figures    building the chart of a few tickers (charts.build_rsi_figure)
+# The panels contain NaN gaps and recently listed tickers (leading NaNs) like real data.
+# The seconds are measured without tracemalloc, the peak memory in a separate run of the stages.
+# Results (seconds, throughput, peak memory) are saved as JSON and can be compared, e.g.
+#   python benchmark.py --quick --output before.json
+#   python benchmark.py --quick --output after.json --compare before.json
+# --startup measures the time to the first paint of the apps instead, cold (in a new process,
+# before the data service has any data) and warm (the same app again in that process). It uses
+# the local cache (HOT_STOCKS_CACHE) like the apps do.
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from profiling import Profiler
+from cross_section import cross_section
+from rsi import compute_rsi, compute_rsi_matrix
+from screener import hot_list
+
+TICKERS = (100, 500, 5000)
+BARS = (250, 2500, 25000)
+QUICK_TICKERS = (100, 500)
+QUICK_BARS = (250, 2500)
+APPS = ('Hot_Stocks.py', 'SP500.py')
+
+# Runs an app twice with streamlit's AppTest and prints the first paints the app reported
+STARTUP_SCRIPT = '''
+import json, sys
+from streamlit.testing.v1 import AppTest
+paints = []
+for run in range(2):
+    at = AppTest.from_file(sys.argv[1], default_timeout=600).run()
+    paints.append(list(at.session_state.first_paint) if 'first_paint' in at.session_state else None)
+print(json.dumps(paints))
+'''
+
+
+# Synthetic OHLCV panel: one (bars x tickers) frame per field
+# nan_fraction: share of missing bars, listed_fraction: share of tickers listed during the period
+def synthetic_panel(n_tickers, n_bars, seed=0, nan_fraction=0.01, listed_fraction=0.05,
+                    fields=('Open', 'High', 'Low', 'Close', 'Volume')):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end='2026-01-02', periods=n_bars, name='Date')
+    tickers = [f'T{i:05d}' for i in range(n_tickers)]
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (n_bars, n_tickers)), axis=0))
+    close[rng.random((n_bars, n_tickers)) < nan_fraction] = np.nan
+    listed = np.flatnonzero(rng.random(n_tickers) < listed_fraction)
+    for column, first_bar in zip(listed, rng.integers(0, n_bars, len(listed))):
+        close[:first_bar, column] = np.nan
+    spread = np.abs(rng.normal(0, 0.01, (n_bars, n_tickers)))
+    values = {'Close': close, 'Open': close * (1 + rng.normal(0, 0.005, (n_bars, n_tickers))),
+              'High': close * (1 + spread), 'Low': close * (1 - spread),
+              'Volume': np.where(np.isnan(close), np.nan, rng.integers(1e5, 1e7, (n_bars, n_tickers)))}
+    return {field: pd.DataFrame(values[field], index=dates, columns=tickers) for field in fields}
+
+
+# Run all stages of one panel with a profiler
+def _run_stages(profiler, closes, figures, legacy):
+    points = closes.size
+    if legacy:
+        with profiler.stage('compute_rsi loop', points):
+            hot_stocks = []
+            for ticker in closes.columns:
+                y = compute_rsi(closes[ticker], 14).tolist()
+                if len(y) > 0 and (y[-1] < 30 or y[-1] > 70):
+                    hot_stocks.append(ticker)
+    with profiler.stage('compute_rsi_matrix', points):
+        compute_rsi_matrix(closes, 14)
+    with profiler.stage('hot stock screen', points):
+        rsi_data, current_rsi = compute_rsi_matrix(closes, 14)
+        hot_list(current_rsi, closes, 30, 70)
+    sectors = pd.Series([f'Sector {i % 11}' for i in range(closes.shape[1])], index=closes.columns)
+    with profiler.stage('cross section', points):
+        cross_section(rsi_data, current_rsi, sectors)
+    if figures:
+        from charts import build_rsi_figure
+        dates = pd.Series(closes.index)
+        with profiler.stage('draw_rsi figures', figures):
+            for ticker in closes.columns[:figures]:
+                build_rsi_figure(dates, closes[ticker].to_numpy(), rsi_data[ticker].to_numpy(), ticker,
+                                 f"Daily Stock Price & RSI of {ticker}")
+    return profiler.records()
+
+
+# Run all stages for one panel size and return the measurements
+# The stages are timed without tracemalloc (tracing slows down every allocation) and run a
+# second time with tracemalloc for their peak memory
+def run_case(n_tickers, n_bars, figures=5, legacy=True, seed=0):
+    closes = synthetic_panel(n_tickers, n_bars, seed, fields=('Close',))['Close']
+    timed = _run_stages(Profiler(enabled=True, track_memory=False), closes, figures, legacy)
+    traced = _run_stages(Profiler(enabled=True, track_memory=True), closes, figures, legacy)
+
+    results = []
+    for record, memory in zip(timed, traced):
+        record.update({'tickers': n_tickers, 'bars': n_bars, 'peak_memory_bytes': memory['peak_memory_bytes'],
+                       'throughput': record['rows'] / record['seconds'] if record['seconds'] else None,
+                       'throughput_unit': 'figures/s' if record['stage'] == 'draw_rsi figures' else 'points/s'})
+        results.append(record)
+    return results
+
+
+# Cold and warm time to the first paint of every app, each app in its own process
+def startup_times(apps=APPS):
+    folder = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    for app in apps:
+        started = time.perf_counter()
+        run = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT, os.path.join(folder, app)],
+                             capture_output=True, text=True, cwd=folder)
+        total = time.perf_counter() - started
+        lines = run.stdout.strip().splitlines()
+        if run.returncode or not lines:
+            raise RuntimeError(f"{app} could not be run: {run.stderr.strip()[-500:]}")
+        for paint in json.loads(lines[-1]):
+            if paint is not None:
+                results.append({'stage': f'first paint ({paint[0]})', 'app': app, 'seconds': paint[1],
+                                'tickers': None, 'bars': None})
+        results.append({'stage': 'process total', 'app': app, 'seconds': total, 'tickers': None, 'bars': None})
+    return results
+
+
+def environment():
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+            'machine': platform.machine(), 'system': platform.system(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+# Print the speed of this run relative to an earlier run (>1 means faster now)
+def compare(results, previous):
+    earlier = {(r['stage'], r.get('app'), r['tickers'], r['bars']): r['seconds'] for r in previous['results']}
+    print(f"{'stage':<20}{'tickers':>8}{'bars':>8}{'before [s]':>12}{'now [s]':>10}{'speedup':>9}")
+    for r in results:
+        before = earlier.get((r['stage'], r.get('app'), r['tickers'], r['bars']))
+        if before is not None:
+            size = (r['tickers'], r['bars']) if r.get('app') is None else (r['app'], '')
+            print(f"{r['stage']:<20}{size[0]:>8}{size[1]:>8}{before:>12.4f}{r['seconds']:>10.4f}"
+                  f"{before / r['seconds']:>9.2f}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the RSI, screening and chart building hot paths")
+    parser.add_argument('--tickers', type=int, nargs='+', help=f"panel widths (default: {' '.join(map(str, TICKERS))})")
+    parser.add_argument('--bars', type=int, nargs='+', help=f"panel lengths (default: {' '.join(map(str, BARS))})")
+    parser.add_argument('--quick', action='store_true',
+                        help=f"only the small panels ({QUICK_TICKERS} tickers x {QUICK_BARS} bars)")
+    parser.add_argument('--figures', type=int, default=5, help="number of figures to build per panel (default: 5)")
+    parser.add_argument('--skip-legacy', action='store_true', help="don't time the per ticker compute_rsi loop")
+    parser.add_argument('--startup', action='store_true',
+                        help="measure the cold and warm time to the first paint of the apps instead")
+    parser.add_argument('--seed', type=int, default=0, help="random seed of the synthetic prices")
+    parser.add_argument('--output', default='bench_results.json', help="JSON file for the results")
+    parser.add_argument('--compare', help="JSON file of an earlier run to compare with")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    tickers = args.tickers or (QUICK_TICKERS if args.quick else TICKERS)
+    bars = args.bars or (QUICK_BARS if args.quick else BARS)
+    results = []
+    if args.startup:
+        results = startup_times()
+        for record in results:
+            print(f"{record['stage']:<20}{record['app']:<16}{record['seconds']:>10.4f} s", file=sys.stderr)
+        tickers = bars = ()
+    for n_tickers in tickers:
+        for n_bars in bars:
+            for record in run_case(n_tickers, n_bars, args.figures, not args.skip_legacy, args.seed):
+                results.append(record)
+                print(f"{record['stage']:<20}{n_tickers:>6} x {n_bars:<6}{record['seconds']:>10.4f} s"
+                      f"{record['throughput']:>14.0f} {record['throughput_unit']:<10}"
+                      f"{record['peak_memory_bytes'] / 2 ** 20:>9.1f} MiB", file=sys.stderr)
+    with open(args.output, 'w') as f:
+        json.dump({'environment': environment(), 'seed': args.seed, 'results': results}, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+# Charts of the Hot Stocks apps: stock price and RSI of one ticker in two subplots
+# Long series are downsampled to about the width of the chart in pixels (see downsample.py)
+# before they are sent to the browser, and drawn with WebGL
+# plotly is only imported when the first figure is built, so the apps can show their tables
+# before paying for the import
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from downsample import downsample
+
+# Figures that were already built, memoized per (ticker, interval, range, RSI window, first/last bar,
+# title, thresholds)
+# so paging back and forth through the hot stocks doesn't rebuild them on every rerun
+MAX_FIGURES = 128
+_figures = OrderedDict()
+# the figures are shared by the sessions of the app, which run in threads of their own
+_figures_lock = threading.Lock()
+# Points per series sent to the browser (the charts are 1800 pixels wide)
+MAX_POINTS = 2000
+# Series longer than this are drawn with WebGL (Scattergl) instead of SVG
+GL_POINTS = 5000
+ZONE_COLOR = 'rgb(222, 196, 200)'
+
+# Ranges of the daily and the intraday charts, the chart shows the bars after last bar - offset
+# The range is chosen in the app (not with plotly's range selector, which only zooms in the browser)
+# so the bars of a shorter range are downsampled again and shown in more detail
+DAILY_RANGES = ["All", "YTD", "6m", "3m", "1m"]
+INTRADAY_RANGES = ["All", "5d", "1d", "1h"]
+OFFSETS = {"6m": pd.DateOffset(months=6), "3m": pd.DateOffset(months=3), "1m": pd.DateOffset(months=1),
+           "5d": pd.Timedelta(days=5), "1d": pd.Timedelta(days=1), "1h": pd.Timedelta(hours=1)}
+
+
+# Ranges that can be chosen for the charts of an interval
+def chart_ranges(interval):
+    return DAILY_RANGES if interval == '1d' else INTRADAY_RANGES
+
+
+# First date of a range of the chart (None for all bars)
+def range_start(dates, chart_range):
+    if chart_range == "All" or len(dates) == 0:
+        return None
+    last = pd.Timestamp(dates[-1])
+    if chart_range == "YTD":
+        return last.normalize().replace(month=1, day=1)
+    return last - OFFSETS[chart_range]
+
+
+# Name of the bars in the chart titles, e.g. "Daily" or "5m"
+def bar_label(interval):
+    return "Daily" if interval == '1d' else interval
+
+
+# Draw the Stock Price and RSI of a company with Date on x-axes
+def build_rsi_figure(dates, close, rsi, name, title, low=30, high=70, interval='1d', max_points=MAX_POINTS,
+                     window=14):
+    from plotly import graph_objs as go
+    from plotly.subplots import make_subplots
+    dates = pd.DatetimeIndex(dates)
+    close = np.asarray(close, dtype=np.float64)
+    rsi = np.asarray(rsi, dtype=np.float64)
+    scatter = go.Scattergl if len(dates) > GL_POINTS else go.Scatter
+    # the extremes and the crossings of the thresholds are always kept
+    shown_close = downsample(dates, close, max_points)
+    shown_rsi = downsample(dates, rsi, max_points, levels=(low, high))
+
+    fig = make_subplots(rows=2, cols=1, subplot_titles=(
+        f"{bar_label(interval)} Stock Price of {name}", f"RSI ({window}) for {name}"))
+    fig.add_trace(scatter(x=dates[shown_close], y=close[shown_close],
+                          mode='lines',
+                          name=name + " (Stock Price)",
+                          line=dict(color="Orange", width=2.5), legendgroup="1"), row=1, col=1)
+    fig.add_trace(scatter(x=dates[shown_rsi], y=rsi[shown_rsi],
+                          mode='lines',
+                          name=name + " (RSI)",
+                          line=dict(color="Red", width=2.5), legendgroup="2"), row=2, col=1)
+    # the thresholds are shapes spanning the whole x-axis, not traces with a point per bar
+    fig.add_hrect(y0=low, y1=high, fillcolor=ZONE_COLOR, opacity=0.3, line_width=0, row=2, col=1)
+    fig.add_hline(y=high, line=dict(width=0.5, color=ZONE_COLOR, dash='dash'),
+                  annotation_text='Overbought', annotation_position='top left', row=2, col=1)
+    fig.add_hline(y=low, line=dict(width=0.5, color=ZONE_COLOR, dash='dash'),
+                  annotation_text='Oversold', annotation_position='bottom left', row=2, col=1)
+
+    # update axis ticks
+    fig.update_yaxes(nticks=30, showgrid=True,
+                     title_text="Closing Stock Price [USD]", row=1, col=1)
+    fig.update_yaxes(nticks=30, showgrid=True,
+                     title_text="RSI", row=2, col=1)
+    fig.update_xaxes(nticks=12, showgrid=True,
+                     title_text="Date")
+    fig.update_layout(xaxis=dict(type="date"))
+    fig.update_xaxes(matches='x')
+
+    # update layout
+    fig.update_layout(title=f"<b>{title}</b>", template="plotly", height=1200, width=1800, legend_tracegroupgap=180
+                      )
+
+    # update legend
+    fig.update_layout(legend=dict(
+        orientation="h",
+        yanchor="bottom",
+        y=1.02,
+        xanchor="right",
+        x=1
+    ))
+    return fig
+
+
+# Figure of the memo, or None
+def _memo_get(key):
+    with _figures_lock:
+        fig = _figures.get(key)
+        if fig is not None:
+            _figures.move_to_end(key)
+        return fig
+
+
+def _memo_put(key, fig):
+    with _figures_lock:
+        _figures[key] = fig
+        _figures.move_to_end(key)
+        while len(_figures) > MAX_FIGURES:
+            _figures.popitem(last=False)
+    return fig
+
+
+# Last value(s) of a series as bytes, so they can be part of a memo key (NaN included)
+def _last(values):
+    values = np.asarray(values, dtype=np.float64)
+    return values[-1].tobytes() if len(values) else b''
+
+
+# Memoized version of build_rsi_figure for a ticker, showing the bars of a range of the chart
+# A figure is only rebuilt when a new bar arrived, the last bar changed (today's bar is updated
+# during the day) or the shown range/thresholds changed
+def rsi_figure(ticker, dates, close, rsi, name, title, low=30, high=70, interval='1d', chart_range="All",
+               window=14):
+    dates = pd.DatetimeIndex(dates)
+    key = (ticker, interval, chart_range, window, dates[0], dates[-1], _last(close), _last(rsi), title, low, high)
+    fig = _memo_get(key)
+    if fig is not None:
+        return fig
+    start = range_start(dates, chart_range)
+    first = 0 if start is None else dates.searchsorted(start)
+    # the RSI is computed on all bars and only cut afterwards, so it is warmed up at the start of the range
+    fig = build_rsi_figure(dates[first:], np.asarray(close)[first:], np.asarray(rsi)[first:], name, title,
+                           low, high, interval, window=window)
+    return _memo_put(key, fig)
+
+
+# Heatmap of a sector measure over time (see cross_section.sector_history), sectors as rows
+# Long histories are thinned out to MAX_POINTS bars (the last bar is always kept)
+def build_sector_heatmap(history, measure='Mean RSI', title=None):
+    from plotly import graph_objs as go
+    values = history[measure]
+    step = -(-len(values) // MAX_POINTS)
+    values = values.iloc[::-1].iloc[::step].iloc[::-1]
+    scale = dict(colorscale='RdYlGn_r', zmin=0, zmax=100, zmid=50) if measure in ('Mean RSI', 'Breadth') \
+        else dict(colorscale='Reds', zmin=0)
+    fig = go.Figure(go.Heatmap(x=values.index, y=values.columns, z=values.to_numpy().T,
+                               colorbar=dict(title=measure), hoverongaps=False, **scale))
+    fig.update_layout(title=f"<b>{title or measure + ' per Sector'}</b>", template="plotly",
+                      height=max(400, 40 * len(values.columns)), width=1800)
+    fig.update_xaxes(title_text="Date")
+    return fig
+
+
+# Memoized version of build_sector_heatmap, rebuilt when a new bar arrived or the last bar changed
+def sector_heatmap(universe, interval, history, measure='Mean RSI', title=None):
+    last = history[measure].iloc[-1].to_numpy(dtype=np.float64).tobytes() if len(history) else b''
+    key = ('sectors', universe, interval, measure, title, len(history),
+           history.index[-1] if len(history) else None, tuple(history[measure].columns), last)
+    fig = _memo_get(key)
+    if fig is not None:
+        return fig
+    return _memo_put(key, build_sector_heatmap(history, measure, title))
+
+
+# Split the hot stocks into pages and return the tickers of one page (pages start at 1)
+def page_of(tickers, page, page_size):
+    return tickers[(page - 1) * page_size:page * page_size]
+
+
+# Number of pages needed to show all tickers
+def page_count(tickers, page_size):
+    return max(1, -(-len(tickers) // page_size))
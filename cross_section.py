@@ -0,0 +1,67 @@
+# Cross-sectional view of the RSI of a whole universe
+# Instead of only the hot stocks (<30 or >70) all tickers are ranked by their current RSI and
+# the RSI is aggregated per sector. The sector history (mean RSI, number of oversold and
+# overbought tickers and breadth per bar) is computed from the full RSI matrix (dates x tickers)
+# in one pass: every measure is a product of the matrix with a (tickers x sectors) 0/1 matrix,
+# so there is no loop over tickers or sectors.
+#   breadth: share of the tickers of a sector with an RSI above 50 (upward momentum), in %
+import numpy as np
+import pandas as pd
+
+MEASURES = ['Mean RSI', 'Oversold', 'Overbought', 'Breadth']
+
+
+# Rank of every ticker by its current RSI (1 = lowest RSI), percentile in the universe and in
+# its sector (0 = lowest, 100 = highest RSI)
+def rank_table(current_rsi, sectors, low=30, high=70):
+    rsi = current_rsi.dropna()
+    sector = sectors.reindex(rsi.index).fillna('Unknown')
+    table = pd.DataFrame({
+        'Sector': sector,
+        'RSI': rsi,
+        'Rank': rsi.rank(method='min').astype(int),
+        'Percentile': rsi.rank(pct=True) * 100,
+        'Sector Percentile': rsi.groupby(sector).rank(pct=True) * 100,
+        'Zone': np.where(rsi < low, 'oversold', np.where(rsi > high, 'overbought', 'neutral')),
+    }, index=rsi.index.rename('Symbol'))
+    return table.sort_values('Rank')
+
+
+# Sector aggregates of every bar: frame with (measure, sector) columns, see MEASURES
+def sector_history(rsi, sectors, low=30, high=70):
+    names = sectors.reindex(rsi.columns).fillna('Unknown')
+    codes, labels = pd.factorize(names, sort=True)
+    members = np.zeros((len(codes), len(labels)))
+    members[np.arange(len(codes)), codes] = 1.0
+    values = rsi.to_numpy(dtype=np.float64)
+    valid = ~np.isnan(values)
+    counts = valid @ members
+    with np.errstate(invalid='ignore', divide='ignore'):
+        measures = {
+            'Mean RSI': np.where(valid, values, 0.0) @ members / counts,
+            'Oversold': (values < low) @ members,
+            'Overbought': (values > high) @ members,
+            'Breadth': (values > 50) @ members / counts * 100,
+        }
+    return pd.concat({measure: pd.DataFrame(array, index=rsi.index, columns=labels)
+                      for measure, array in measures.items()}, axis=1)
+
+
+# Sector table of the last bar: number of tickers, mean and median RSI, oversold and overbought
+# tickers and breadth, sorted by mean RSI
+def sector_summary(current_rsi, sectors, low=30, high=70):
+    rsi = current_rsi.dropna()
+    groups = rsi.groupby(sectors.reindex(rsi.index).fillna('Unknown'))
+    summary = groups.agg(**{'Tickers': 'count', 'Mean RSI': 'mean', 'Median RSI': 'median',
+                            'Oversold': lambda r: int((r < low).sum()),
+                            'Overbought': lambda r: int((r > high).sum()),
+                            'Breadth': lambda r: (r > 50).mean() * 100})
+    summary.index.name = 'Sector'
+    return summary.sort_values('Mean RSI')
+
+
+# Everything at once, as kept in the snapshots of the data service
+def cross_section(rsi, current_rsi, sectors, low=30, high=70):
+    return {'ranking': rank_table(current_rsi, sectors, low, high),
+            'sectors': sector_summary(current_rsi, sectors, low, high),
+            'history': sector_history(rsi, sectors, low, high)}
@@ -0,0 +1,236 @@
+# Process-wide data service shared by all Streamlit sessions
+# Streamlit runs every browser session in the same process, but each session used to scrape
+# Wikipedia, download all prices and compute the RSI on its own. The data service does this
+# once per universe on an asyncio event loop in a background thread:
+#   - concurrent requests for the same universe wait for one shared refresh (coalescing)
+#   - after the first request the universe is refreshed on a schedule (refresh_every)
+#   - sessions get read-only snapshots, so the per-session work is rendering only
+#   - the zones of all tickers are saved after every change of the last bar and zone changes are
+#     logged (see alerts.py)
+#   - a universe that is part of a larger one (the S&P 100 of the S&P 500, see universes.py) is
+#     refreshed together with it: one download and one RSI computation for both, the snapshot of
+#     the smaller universe only filters the results
+# Daily bars come from the on-disk price store, intraday bars (1h/15m/5m/1m) from a bounded
+# ring buffer per universe (see intraday.py), e.g.
+#   snapshot = get_service().get("sp500")
+#   snapshot = get_service().get("sp500", interval="5m")
+import asyncio
+import os
+import threading
+import time
+
+from alerts import AlertStore, hot_from_table, zone_table
+from cross_section import cross_section
+from intraday import INTERVALS, IntradayFeed
+from price_store import PriceStore, period_start
+from profiling import Profiler
+from rsi import close_matrix, compute_rsi_matrix
+from rsi_index import BUDGET, WINDOWS, RSIIndex
+from universes import load_universe, pipeline_members, pipeline_universe, sectors
+
+# Stages of a refresh in the order they run (see DataService.progress)
+STAGES = ['constituent load', 'price fetch', 'indicator compute', 'screening', 'cross section']
+
+
+# Everything the apps need about one universe at one point in time
+# The arrays of the prices are read-only and pandas copies on write, so the snapshots can be
+# shared between sessions safely
+class Snapshot:
+    def __init__(self, universe, constituents, prices, rsi, current_rsi, hot, timings, interval='1d',
+                 ranking=None, sectors=None, sector_history=None, rsi_index=None):
+        self.universe = universe
+        self.interval = interval
+        self.constituents = constituents
+        self.prices = prices
+        self.rsi = rsi
+        self.current_rsi = current_rsi
+        self.hot = hot
+        # cross-sectional view (see cross_section.py): RSI rank of every ticker, sector table of
+        # the last bar and sector measures of every bar
+        self.ranking = ranking
+        self.sectors = sectors
+        self.sector_history = sector_history
+        # RSI series of every ticker for several windows (see rsi_index.py)
+        self.rsi_index = rsi_index
+        self.timings = timings  # stage timings of the refresh that built the snapshot
+        self.updated_at = time.time()
+
+
+class DataService:
+    # period is the history of the daily bars, intraday bars are kept in ring buffers of
+    # display_bars bars plus the RSI warm-up
+    # windows: RSI windows that are precomputed for the charts, within rsi_budget bytes
+    # track_memory: record the peak memory of the refresh stages (default: HOT_STOCKS_PROFILE=memory)
+    def __init__(self, store=None, refresh_every=15 * 60, period='ytd', time_window=14,
+                 low=30, high=70, display_bars=None, windows=WINDOWS, rsi_budget=BUDGET, track_memory=None):
+        # the service decides when to refresh, so the store tops up whenever it is asked to
+        self.store = PriceStore(refresh_every=0) if store is None else store
+        self.alerts = AlertStore(os.path.join(self.store.root, 'alerts'))
+        self.refresh_every = refresh_every
+        self.period = period
+        self.display_bars = display_bars
+        self.windows = tuple(sorted(set(windows) | {time_window}))
+        self.rsi_budget = rsi_budget
+        self.time_window = time_window
+        self.low = low
+        self.high = high
+        self.track_memory = track_memory
+        self._snapshots = {}
+        self._inflight = {}
+        self._scheduled = {}
+        self._feeds = {}
+        self._stages = {}
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name='hot-stocks-data-service', daemon=True).start()
+
+    # Ring buffer of the intraday bars of a universe, a new one when the constituents changed
+    def _feed(self, universe, interval, symbols):
+        feed = self._feeds.get((universe, interval))
+        if feed is None or feed.ring.tickers != [str(s) for s in symbols]:
+            options = {} if self.display_bars is None else {'display_bars': self.display_bars}
+            feed = IntradayFeed(symbols, interval, self.store, self.time_window, **options)
+            self._feeds[(universe, interval)] = feed
+        return feed
+
+    # Build new snapshots of a universe and of the universes that are part of it (runs in a worker
+    # thread, it is blocking I/O): {universe: snapshot}
+    # The prices and the RSI are computed once for the symbols of all these universes
+    def _build(self, universe, interval):
+        profiler = Profiler(enabled=True, track_memory=self.track_memory,
+                            on_stage=lambda name: self._stages.__setitem__((universe, interval), name))
+        with profiler.stage('constituent load') as stage:
+            members = {member: load_universe(member) for member in pipeline_members(universe)}
+            member_symbols = {member: constituents['Symbol'].astype(str).tolist()
+                              for member, constituents in members.items()}
+            symbols = list(dict.fromkeys(s for tickers in member_symbols.values() for s in tickers))
+            stage.rows = len(symbols)
+        with profiler.stage('price fetch') as stage:
+            if interval == '1d':
+                # served from the memory-mapped panel of the cache, only the symbols are copied
+                prices = self.store.load_panel(symbols, start=period_start(self.period), interval=interval, mmap=True)
+            else:
+                feed = self._feed(universe, interval, symbols)
+                feed.refresh()
+                prices = feed.panel()
+            for array in prices.arrays.values():
+                array.setflags(write=False)
+            stage.rows = len(prices)
+        with profiler.stage('indicator compute') as stage:
+            closes = close_matrix(prices, symbols)
+            rsi, current_rsi = compute_rsi_matrix(closes, self.time_window)
+            rsi_index = RSIIndex(closes, self.windows, self.rsi_budget).build({self.time_window: rsi})
+            stage.rows = closes.size * len(self.windows)
+        with profiler.stage('screening') as stage:
+            # the hot list always comes from the current RSI, the last bar may have changed since
+            # it was first recorded (the saved table is only written again when it did)
+            settings = dict(time_window=self.time_window, low=self.low, high=self.high, interval=interval)
+            tables = {}
+            for member, tickers in member_symbols.items():
+                table = zone_table(current_rsi[tickers], closes[tickers], self.low, self.high)
+                if len(prices):
+                    self.alerts.record(member, table, prices.dates[-1], **settings)
+                tables[member] = table
+            stage.rows = len(current_rsi)
+        with profiler.stage('cross section') as stage:
+            views = {member: cross_section(rsi[tickers], current_rsi[tickers], sectors(members[member], member),
+                                           self.low, self.high)
+                     for member, tickers in member_symbols.items()}
+            stage.rows = rsi.size
+        snapshots = {}
+        timings = profiler.records()
+        for member, tickers in member_symbols.items():
+            # the RSI index is shared, a smaller universe gets a copy of its columns of the prices
+            member_prices = prices if tickers == symbols else prices.select(tickers)
+            for array in member_prices.arrays.values():
+                array.setflags(write=False)
+            view = views[member]
+            snapshots[member] = Snapshot(member, members[member], member_prices, rsi[tickers], current_rsi[tickers],
+                                         hot_from_table(tables[member]), timings, interval, view['ranking'],
+                                         view['sectors'], view['history'], rsi_index)
+        return snapshots
+
+    # Snapshots are kept per key = (universe, interval), refreshes and schedules per key of the
+    # universe that is downloaded (see universes.pipeline_universe)
+    async def _refresh(self, key):
+        snapshots = await self._loop.run_in_executor(None, self._build, *key)
+        for universe, snapshot in snapshots.items():
+            self._snapshots[(universe, key[1])] = snapshot
+        return snapshots
+
+    # Refresh a universe, or wait for the refresh that is already running
+    def _coalesced_refresh(self, key):
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._loop.create_task(self._refresh(key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task
+
+    async def _keep_fresh(self, key):
+        while True:
+            await asyncio.sleep(self.refresh_every)
+            try:
+                await self._coalesced_refresh(key)
+            except Exception:
+                pass  # e.g. offline: keep serving the last snapshot and try again later
+
+    async def _get(self, key, force):
+        pipeline = (pipeline_universe(key[0]), key[1])
+        if pipeline not in self._scheduled:
+            self._scheduled[pipeline] = self._loop.create_task(self._keep_fresh(pipeline))
+        if key in self._snapshots and not force:
+            return self._snapshots[key]
+        return (await asyncio.shield(self._coalesced_refresh(pipeline)))[key[0]]
+
+    # Latest snapshot of a universe as a concurrent.futures.Future, so the apps can show something
+    # else while the very first refresh (or a forced one) is running
+    def submit(self, universe, interval='1d', force=False):
+        if interval not in INTERVALS:
+            raise ValueError(f"Unknown interval: {interval}")
+        return asyncio.run_coroutine_threadsafe(self._get((universe, interval), force), self._loop)
+
+    # Latest snapshot of a universe; only the very first request (or force=True) waits for a refresh
+    def get(self, universe, interval='1d', force=False, timeout=None):
+        snapshot = self.cached(universe, interval)
+        if snapshot is not None and not force:
+            return snapshot
+        return self.submit(universe, interval, force).result(timeout)
+
+    # Snapshot that is already in memory (None before the first refresh)
+    def cached(self, universe, interval='1d'):
+        return self._snapshots.get((universe, interval))
+
+    # Progress of the running refresh of a universe: (share of the stages done, current stage)
+    def progress(self, universe, interval='1d'):
+        stage = self._stages.get((pipeline_universe(universe), interval))
+        if stage not in STAGES:
+            return 0.0, None
+        return STAGES.index(stage) / len(STAGES), stage
+
+    # Cancel the scheduled and running refreshes
+    async def _shutdown(self):
+        tasks = list(self._scheduled.values()) + list(self._inflight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._scheduled.clear()
+
+    # Stop the service, after waiting (at most timeout seconds) until its tasks are cancelled
+    def stop(self, timeout=10):
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout)
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+# The one data service of this process
+def get_service():
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = DataService()
+        return _service
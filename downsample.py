@@ -0,0 +1,64 @@
+# Downsampling of long price and RSI series for the charts
+# A chart can't show more points than it has pixels, but plotly sends every point to the
+# browser: years of daily bars or days of 1 minute bars are hundreds of thousands of points.
+# LTTB (Largest Triangle Three Buckets, Steinarsson 2013) keeps the shape of a line with far
+# fewer points: the series is split into buckets and from every bucket the point is kept that
+# spans the largest triangle with the point kept before and the mean of the next bucket.
+# On top of that the extremes are always kept, and in every bucket in which the series crosses
+# a level (e.g. RSI 30/70) the lowest and highest point are kept, so no signal disappears from
+# the chart while the number of points stays bounded (at most 3 per bucket).
+import numpy as np
+
+
+# Start of the n_out - 2 buckets between the first and the last point (plus the end of the last one)
+def bucket_edges(n, n_out):
+    return np.linspace(1, n - 1, n_out - 1).astype(int)
+
+
+# Indices of the n_out points that LTTB keeps of the series (x, y), first and last included
+def lttb(x, y, n_out):
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = bucket_edges(n, n_out)
+    selected = np.empty(n_out, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        mean_x = x[end:next_end].mean()
+        mean_y = y[end:next_end].mean()
+        area = np.abs((x[a] - mean_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (mean_y - y[a]))
+        a = start + int(area.argmax())
+        selected[i + 1] = a
+    return selected
+
+
+# Indices of the points where the series crosses one of the levels (the last point before the crossing)
+def crossings(y, levels):
+    indices = [np.flatnonzero(np.diff(np.sign(y - level)) != 0) for level in levels]
+    return np.concatenate(indices) if indices else np.empty(0, dtype=int)
+
+
+# Indices of the points of a series to draw: about n_out points (at most 3 * n_out), missing
+# values (NaN) are left out
+# x can be dates (DatetimeIndex or datetime64 array) or numbers
+def downsample(x, y, n_out, levels=()):
+    y = np.asarray(y, dtype=np.float64)
+    valid = np.flatnonzero(~np.isnan(y))
+    if len(valid) <= n_out:
+        return valid
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype('datetime64[ns]').astype(np.int64)
+    x, y = x[valid], y[valid]
+    keep = [lttb(x, y, n_out), [int(y.argmin()), int(y.argmax())]]
+    edges = bucket_edges(len(y), n_out)
+    crossed = np.unique(np.clip(np.searchsorted(edges, crossings(y, levels), side='right') - 1, 0, len(edges) - 2))
+    for bucket in crossed:
+        start, end = edges[bucket], edges[bucket + 1] + 1
+        keep.append([start + int(y[start:end].argmin()), start + int(y[start:end].argmax())])
+    return valid[np.unique(np.concatenate(keep).astype(int))]
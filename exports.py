@@ -0,0 +1,160 @@
+# Exports of the data of a universe as CSV, Parquet or Arrow IPC
+# The apps used to put the companies table into the page as a base64 data link on every rerun,
+# which made the page about a third larger than the table itself. The exports are only written
+# when a download is requested and the data is written in chunks of rows, so the prices or the
+# RSI of a large universe never exist as one big table or string:
+#   constituents  the companies of the universe
+#   prices        Open, High, Low, Close, Volume of every ticker and bar (one row per date and ticker)
+#   indicators    close and RSI of every ticker and bar for every window of the RSI index
+#   hot           the hot stocks of the last bar
+# Parquet files get one row group and Arrow IPC files one record batch per chunk, e.g.
+#   python exports.py --universe sp500 --export prices --output prices.parquet
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from data_service import DataService
+from panel import FIELDS
+from price_store import FileSource, PriceStore
+from universes import UNIVERSES
+
+EXPORTS = ['constituents', 'prices', 'indicators', 'hot']
+# format: (file extension, MIME type)
+FORMATS = {'CSV': ('csv', 'text/csv'),
+           'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+           'Arrow IPC': ('arrow', 'application/vnd.apache.arrow.file')}
+CHUNK_ROWS = 100_000
+
+
+# Rows of a frame in chunks (at least one chunk, so an empty export still has its columns)
+def _row_chunks(frame, chunk_rows):
+    for start in range(0, max(len(frame), 1), chunk_rows):
+        yield frame.iloc[start:start + chunk_rows]
+
+
+# Long frames (Date, Ticker, columns) of blocks of tickers with about chunk_rows rows each
+# columns: {name: function(tickers, panel columns) -> (dates x tickers) array}, rows without a
+# close are dropped
+def _panel_chunks(prices, columns, chunk_rows):
+    tickers = prices.tickers
+    block = max(1, chunk_rows // max(len(prices), 1))
+    for start in range(0, max(len(tickers), 1), block):
+        names = tickers[start:start + block]
+        frame = pd.DataFrame({'Date': np.tile(prices.dates.to_numpy(), len(names)),
+                              'Ticker': np.repeat(names, len(prices))})
+        for name, values in columns.items():
+            frame[name] = np.asarray(values(names, slice(start, start + block))).ravel(order='F')
+        yield frame[frame['Close'].notna()].reset_index(drop=True)
+
+
+# The data of an export of a snapshot (see data_service.py) as frames of at most about chunk_rows rows
+def chunks(snapshot, export, chunk_rows=CHUNK_ROWS):
+    prices = snapshot.prices
+    if export == 'constituents':
+        constituents = snapshot.constituents
+        return _row_chunks(constituents.reset_index(drop=constituents.index.name is None), chunk_rows)
+    if export == 'hot':
+        return _row_chunks(snapshot.hot.rename_axis('Symbol').reset_index(), chunk_rows)
+    if export == 'prices':
+        columns = {field: lambda names, block, field=field: prices.arrays[field][:, block] for field in FIELDS}
+        return _panel_chunks(prices, columns, chunk_rows)
+    if export == 'indicators':
+        index = snapshot.rsi_index
+        columns = {'Close': lambda names, block: prices.arrays['Close'][:, block]}
+        columns.update({f'RSI {window}': lambda names, block, window=window: index.matrix(names, window).to_numpy()
+                        for window in index.windows})
+        return _panel_chunks(prices, columns, chunk_rows)
+    raise ValueError(f"unknown export {export!r}, expected one of {', '.join(EXPORTS)}")
+
+
+# Write the chunks to a binary file object in one of the FORMATS
+def write(frames, fmt, out):
+    if fmt == 'CSV':
+        for i, frame in enumerate(frames):
+            out.write(frame.to_csv(index=False, header=i == 0).encode())
+        return
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    writer = schema = None
+    try:
+        for frame in frames:
+            if writer is None:
+                schema = pa.Schema.from_pandas(frame, preserve_index=False)
+                writer = pq.ParquetWriter(out, schema) if fmt == 'Parquet' else pa.ipc.new_file(out, schema)
+            table = pa.Table.from_pandas(frame, schema=schema, preserve_index=False)
+            if fmt == 'Parquet':
+                writer.write_table(table)
+            else:
+                for batch in table.to_batches():
+                    writer.write_batch(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def file_name(universe, export, fmt, interval='1d'):
+    return f"{os.path.splitext(os.path.basename(universe))[0]}_{export}_{interval}.{FORMATS[fmt][0]}"
+
+
+# The export as a file object opened for reading, e.g. as deferred data of st.download_button:
+#   st.download_button(..., data=lambda: export_file(snapshot, 'prices', 'Parquet'))
+# The chunks are written to a temporary file, which is handed out as a plain binary file
+# (io.BufferedReader, one of the types streamlit accepts). The file is removed right away, the
+# open file object stays readable (on Windows the removal fails and the file is left behind)
+def export_file(snapshot, export, fmt, chunk_rows=CHUNK_ROWS):
+    with tempfile.NamedTemporaryFile(suffix='.' + FORMATS[fmt][0], delete=False) as out:
+        write(chunks(snapshot, export, chunk_rows), fmt, out)
+    exported = open(out.name, 'rb')
+    try:
+        os.remove(out.name)
+    except OSError:
+        pass
+    return exported
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Export the data of a universe as CSV, Parquet or Arrow IPC")
+    parser.add_argument('--universe', default='sp100',
+                        help=f"one of {', '.join(UNIVERSES)} or a CSV/Parquet/text file with ticker symbols")
+    parser.add_argument('--export', choices=EXPORTS, default='prices', help="data to export (default: prices)")
+    parser.add_argument('--interval', default='1d', help="bar interval (default: 1d)")
+    parser.add_argument('--output', help="output file (default: stdout)")
+    parser.add_argument('--format', choices=[extension for extension, _ in FORMATS.values()],
+                        help="output format (default: taken from the output file extension, else csv)")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS,
+                        help=f"rows per chunk (default: {CHUNK_ROWS})")
+    parser.add_argument('--cache', help="folder of the local price store")
+    parser.add_argument('--prices', help="read prices from this CSV/Parquet file instead of Yahoo Finance")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    extension = args.format
+    if extension is None:
+        extension = args.output.rsplit('.', 1)[-1] if args.output and '.' in args.output else 'csv'
+    fmt = {ext: name for name, (ext, _) in FORMATS.items()}.get(extension, 'CSV')
+    store_args = {'refresh_every': 0}
+    if args.cache:
+        store_args['root'] = args.cache
+    if args.prices:
+        store_args['source'] = FileSource(args.prices)
+    service = DataService(PriceStore(**store_args))
+    try:
+        snapshot = service.get(args.universe, args.interval)
+    finally:
+        service.stop()
+    frames = chunks(snapshot, args.export, args.chunk_rows)
+    if args.output:
+        with open(args.output, 'wb') as out:
+            write(frames, fmt, out)
+    else:
+        write(frames, fmt, sys.stdout.buffer)
+
+
+if __name__ == '__main__':
+    main()
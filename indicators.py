@@ -0,0 +1,214 @@
+# Indicator pipeline for screening a whole universe at once
+# All indicators work on price matrices (dates x tickers). Intermediate results like the price
+# differences, up/down changes, EMAs and rolling means/standard deviations are computed once
+# per pipeline and shared by every indicator that needs them.
+#
+# Indicators are addressed by name, the number at the end is the time window:
+#   close, high, low                      prices
+#   rsi14, rsi7, rsi21, ...               RSI (same calculation as compute_rsi)
+#   stochrsi14                            Stochastic RSI (0-100) of the RSI with the same window
+#   macd, macd_signal, macd_hist          MACD (12/26/9)
+#   bb_mid20, bb_upper20, bb_lower20      Bollinger Bands (20 days, 2 standard deviations)
+#   bb_pctb20                             Bollinger %B
+#   atr14                                 Average True Range
+# (bb_mid, bb_upper, bb_lower and bb_pctb without a number use 20 days)
+#
+# Screening rules are expressions over these names, e.g. "rsi14 < 30 and close < bb_lower"
+import ast
+import operator
+import re
+
+import numpy as np
+import pandas as pd
+
+from rsi import field_matrix, rsi_from_changes
+
+DEFAULT_WINDOWS = {'rsi': 14, 'stochrsi': 14, 'atr': 14, 'bb_mid': 20, 'bb_upper': 20,
+                   'bb_lower': 20, 'bb_pctb': 20}
+BOLLINGER_WIDTH = 2
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+
+
+class IndicatorPipeline:
+    # close, high, low: price matrices (dates x tickers), high/low are only needed for the ATR
+    def __init__(self, close, high=None, low=None):
+        self.close = close
+        self.high = high
+        self.low = low
+        self._cache = {}
+
+    # Pipeline for the tickers of a PricePanel or a yf.download(group_by='ticker') frame
+    @classmethod
+    def from_data(cls, data, tickers):
+        return cls(field_matrix(data, tickers, 'Close'), field_matrix(data, tickers, 'High'),
+                   field_matrix(data, tickers, 'Low'))
+
+    def _cached(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    # Shared intermediates
+    def diff(self):
+        return self._cached('diff', lambda: self.close.diff(1))
+
+    def up_changes(self):
+        return self._cached('up', lambda: self.diff().clip(lower=0))
+
+    def down_changes(self):
+        return self._cached('down', lambda: self.diff().clip(upper=0).abs())
+
+    def ema(self, span):
+        return self._cached(('ema', span), lambda: self.close.ewm(span=span, min_periods=span).mean())
+
+    def rolling_mean(self, window):
+        return self._cached(('mean', window), lambda: self.close.rolling(window).mean())
+
+    def rolling_std(self, window):
+        return self._cached(('std', window), lambda: self.close.rolling(window).std())
+
+    # Indicators
+    def rsi(self, window=14):
+        return self._cached(('rsi', window), lambda: rsi_from_changes(
+            self.up_changes(), self.down_changes(), self.diff().notna(), window))
+
+    def stochrsi(self, window=14):
+        def compute():
+            rsi = self.rsi(window)
+            lowest = rsi.rolling(window).min()
+            highest = rsi.rolling(window).max()
+            return 100 * (rsi - lowest) / (highest - lowest)
+        return self._cached(('stochrsi', window), compute)
+
+    def macd(self):
+        return self._cached('macd', lambda: self.ema(MACD_FAST) - self.ema(MACD_SLOW))
+
+    def macd_signal(self):
+        return self._cached('macd_signal', lambda: self.macd().ewm(span=MACD_SIGNAL, min_periods=MACD_SIGNAL).mean())
+
+    def macd_hist(self):
+        return self._cached('macd_hist', lambda: self.macd() - self.macd_signal())
+
+    def bb_mid(self, window=20):
+        return self.rolling_mean(window)
+
+    def bb_upper(self, window=20):
+        return self._cached(('bb_upper', window),
+                            lambda: self.rolling_mean(window) + BOLLINGER_WIDTH * self.rolling_std(window))
+
+    def bb_lower(self, window=20):
+        return self._cached(('bb_lower', window),
+                            lambda: self.rolling_mean(window) - BOLLINGER_WIDTH * self.rolling_std(window))
+
+    def bb_pctb(self, window=20):
+        return self._cached(('bb_pctb', window), lambda: (self.close - self.bb_lower(window)) /
+                            (self.bb_upper(window) - self.bb_lower(window)))
+
+    def true_range(self):
+        def compute():
+            if self.high is None or self.low is None:
+                raise ValueError("The ATR needs high and low prices")
+            previous = self.close.shift(1)
+            ranges = [self.high - self.low, (self.high - previous).abs(), (self.low - previous).abs()]
+            return pd.DataFrame(np.fmax.reduce([r.to_numpy() for r in ranges]),
+                                index=self.close.index, columns=self.close.columns)
+        return self._cached('true_range', compute)
+
+    def atr(self, window=14):
+        # smoothed like the RSI averages (decay alpha=1/window)
+        return self._cached(('atr', window), lambda: self.true_range().ewm(
+            com=window - 1, min_periods=window, ignore_na=True).mean())
+
+    # Indicator matrix by name, e.g. 'rsi14', 'bb_lower' or 'close'
+    def get(self, name):
+        name = name.lower()
+        if name in ('close', 'high', 'low'):
+            frame = getattr(self, name)
+            if frame is None:
+                raise ValueError(f"No {name} prices in this pipeline")
+            return frame
+        match = re.fullmatch(r'([a-z_]+?)(\d*)', name)
+        indicator, window = match.group(1), match.group(2)
+        if indicator in ('macd', 'macd_signal', 'macd_hist'):
+            return getattr(self, indicator)()
+        if indicator not in DEFAULT_WINDOWS:
+            raise ValueError(f"Unknown indicator: {name}")
+        return getattr(self, indicator)(int(window) if window else DEFAULT_WINDOWS[indicator])
+
+    # Latest value of an indicator for every ticker
+    def latest(self, name):
+        return self._cached(('latest', name.lower()), lambda: self.get(name).ffill().iloc[-1])
+
+    # Evaluate a screening rule for all tickers at once
+    # over='latest' returns one boolean per ticker (on the latest values), over='all' a
+    # boolean matrix (dates x tickers), e.g. for backtesting
+    # A ticker without the values a rule needs (e.g. no prices) never satisfies it
+    def evaluate(self, rule, over='latest'):
+        lookup = self.latest if over == 'latest' else self.get
+        result = _evaluate(ast.parse(rule, mode='eval').body, lookup)
+        if isinstance(result, pd.Series) and result.dtype == 'boolean' or \
+                isinstance(result, pd.DataFrame) and (result.dtypes == 'boolean').all():
+            result = result.fillna(False).astype(bool)
+        return result
+
+    # Tickers that currently satisfy a screening rule
+    def screen(self, rule):
+        selected = self.evaluate(rule)
+        return selected[selected].index.tolist()
+
+
+# Names used in a screening rule
+def rule_names(rule):
+    return sorted({node.id.lower() for node in ast.walk(ast.parse(rule, mode='eval'))
+                   if isinstance(node, ast.Name)})
+
+
+_COMPARISONS = {ast.Lt: operator.lt, ast.LtE: operator.le, ast.Gt: operator.gt,
+                ast.GtE: operator.ge, ast.Eq: operator.eq, ast.NotEq: operator.ne}
+_ARITHMETIC = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+               ast.Div: operator.truediv}
+
+
+# Whether the values are known (not NaN), element-wise for Series/DataFrames
+def _known(value):
+    return value.notna() if isinstance(value, (pd.Series, pd.DataFrame)) else value == value
+
+
+# Small evaluator for screening rules: only names, numbers, arithmetic, comparisons and
+# and/or/not are allowed, everything is evaluated element-wise on whole Series/DataFrames
+# A comparison with a missing value is unknown (NA of the nullable boolean dtype) instead of
+# False, so that "not" keeps it unknown; and/or combine unknown values like SQL does
+# (unknown and False = False, unknown or True = True)
+def _evaluate(node, lookup):
+    if isinstance(node, ast.BoolOp):
+        values = [_evaluate(value, lookup) for value in node.values]
+        combine = operator.and_ if isinstance(node.op, ast.And) else operator.or_
+        result = values[0]
+        for value in values[1:]:
+            result = combine(result, value)
+        return result
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        value = _evaluate(node.operand, lookup)
+        return ~value if isinstance(value, (pd.Series, pd.DataFrame)) else np.logical_not(value)
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        return -_evaluate(node.operand, lookup)
+    if isinstance(node, ast.Compare):
+        left = _evaluate(node.left, lookup)
+        result = None
+        for op, comparator in zip(node.ops, node.comparators):
+            right = _evaluate(comparator, lookup)
+            if type(op) not in _COMPARISONS:
+                raise ValueError("Unsupported comparison in screening rule")
+            part = _COMPARISONS[type(op)](left, right)
+            if isinstance(part, (pd.Series, pd.DataFrame)):
+                part = part.astype('boolean').mask(~(_known(left) & _known(right)))
+            result = part if result is None else result & part
+            left = right
+        return result
+    if isinstance(node, ast.BinOp) and type(node.op) in _ARITHMETIC:
+        return _ARITHMETIC[type(node.op)](_evaluate(node.left, lookup), _evaluate(node.right, lookup))
+    if isinstance(node, ast.Name):
+        return lookup(node.id)
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+        return node.value
+    raise ValueError(f"Unsupported expression in screening rule: {ast.dump(node)}")
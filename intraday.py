@@ -0,0 +1,194 @@
+# Intraday bars (1m/5m/15m/1h) with bounded memory
+# A year of 1 minute bars is ~100k bars per ticker, far too much to keep for a whole universe.
+# The RSI only needs a warm-up of a few times its window plus the bars that are shown, so the
+# intraday bars live in a ring buffer of fixed capacity: one column per ticker, shared bar times.
+# Bars that drop out of the ring are resampled to a coarser interval and written to the
+# on-disk price store, so the longer history is not lost. Only complete bars of the coarser
+# interval are written, the bars of a bucket that is still partly in the ring wait for the
+# next refresh.
+# The ring holds adjusted prices: a split or dividend in new bars rescales the bars of that
+# ticker in the ring and in the store (see price_store.corporate_actions), the other tickers
+# are not touched.
+import numpy as np
+import pandas as pd
+
+from panel import FIELDS, PricePanel
+from price_store import ADJUSTED, adjusted, corporate_actions, to_long, with_factor
+
+# Intervals that can be selected and how far back Yahoo Finance serves them
+INTERVALS = {'1d': 'ytd', '1h': '730d', '15m': '60d', '5m': '60d', '1m': '7d'}
+INTRADAY_INTERVALS = ['1h', '15m', '5m', '1m']
+MINUTES = {'1m': 1, '5m': 5, '15m': 15, '1h': 60}
+# Bars of an exchange day with pre and post market hours (4:00 - 20:00)
+MINUTES_PER_DAY = 16 * 60
+# RSI warm-up in multiples of the RSI window, after 10 windows the ewm start value weighs < 0.1%
+WARMUP_WINDOWS = 10
+# Coarser interval for the bars that leave the ring buffer
+COMPACT_TO = {'1m': '15m', '5m': '15m', '15m': '1h', '1h': '1h'}
+# Buckets of the coarser intervals, the hourly bars of Yahoo Finance start at half past the hour
+BUCKETS = {'15m': dict(freq='15min'), '1h': dict(freq='1h', offset='30min'), '1d': dict(freq='1D')}
+
+
+# Number of bars the ring buffer keeps: RSI warm-up plus the bars that are shown
+def ring_capacity(time_window=14, display_bars=MINUTES_PER_DAY):
+    return WARMUP_WINDOWS * time_window + display_bars
+
+
+# Start of the bucket of a coarser interval every date belongs to (same buckets as resample_bars)
+def bucket_start(dates, interval):
+    offset = pd.Timedelta(BUCKETS[interval].get('offset', 0))
+    return (pd.DatetimeIndex(dates) - offset).floor(BUCKETS[interval]['freq']) + offset
+
+
+# Resample bars (long layout) to a coarser interval
+def resample_bars(prices, interval):
+    prices = prices.assign(Date=pd.to_datetime(prices['Date']))
+    bars = prices.groupby(['Ticker', pd.Grouper(key='Date', **BUCKETS[interval])]).agg(
+        Open=('Open', 'first'), High=('High', 'max'), Low=('Low', 'min'), Close=('Close', 'last'),
+        Volume=('Volume', 'sum'))
+    bars = bars.dropna(subset=['Close']).reset_index()
+    return bars[['Date', 'Ticker'] + FIELDS]
+
+
+# Fixed size ring buffer of bars for a universe
+# Every field is a (capacity x tickers) array; start is the row of the oldest bar
+class BarRing:
+    def __init__(self, tickers, capacity):
+        self.tickers = [str(t) for t in tickers]
+        self.capacity = capacity
+        self.times = np.full(capacity, np.datetime64('NaT'), dtype='datetime64[ns]')
+        self.arrays = {field: np.full((capacity, len(self.tickers)), np.nan, order='F') for field in FIELDS}
+        self.start = 0
+        self.size = 0
+
+    @property
+    def first_time(self):
+        if self.size == 0:
+            return None
+        return pd.Timestamp(self.times[self.start])
+
+    @property
+    def last_time(self):
+        if self.size == 0:
+            return None
+        return pd.Timestamp(self.times[(self.start + self.size - 1) % self.capacity])
+
+    # Rows of the ring in chronological order
+    def _rows(self):
+        return (self.start + np.arange(self.size)) % self.capacity
+
+    # Multiply the prices of the bars of a ticker in the ring, e.g. after a split
+    def rescale(self, ticker, factor):
+        j = self.tickers.index(str(ticker))
+        for field in ADJUSTED:
+            self.arrays[field][:, j] *= factor
+
+    # Add bars from a (dates x tickers) panel, returns the bars that dropped out (long layout)
+    # A bar with the same time as the newest bar replaces it (it may have been incomplete)
+    def extend(self, panel):
+        times = panel.dates.to_numpy(dtype='datetime64[ns]')
+        values = {field: panel.matrix(field, self.tickers).to_numpy() for field in FIELDS}
+        if self.size:
+            last = self.times[(self.start + self.size - 1) % self.capacity]
+            keep = times >= last
+            times = times[keep]
+            values = {field: array[keep] for field, array in values.items()}
+            if len(times) and times[0] == last:
+                row = (self.start + self.size - 1) % self.capacity
+                for field in FIELDS:
+                    self.arrays[field][row] = values[field][0]
+                times = times[1:]
+                values = {field: array[1:] for field, array in values.items()}
+
+        evicted = []
+        overflow = self.size + len(times) - self.capacity
+        if overflow > 0:
+            # oldest bars leave the ring: first the ones already in it, then new ones that don't fit
+            from_ring = min(overflow, self.size)
+            if from_ring:
+                rows = self._rows()[:from_ring]
+                evicted.append(self._long(self.times[rows], {f: a[rows] for f, a in self.arrays.items()}))
+                self.start = (self.start + from_ring) % self.capacity
+                self.size -= from_ring
+            if overflow > from_ring:
+                skip = overflow - from_ring
+                evicted.append(self._long(times[:skip], {f: a[:skip] for f, a in values.items()}))
+                times = times[skip:]
+                values = {field: array[skip:] for field, array in values.items()}
+
+        rows = (self.start + self.size + np.arange(len(times))) % self.capacity
+        self.times[rows] = times
+        for field in FIELDS:
+            self.arrays[field][rows] = values[field]
+        self.size += len(times)
+        if not evicted:
+            return None
+        return pd.concat(evicted, ignore_index=True)
+
+    def _long(self, times, values):
+        frame = pd.concat({ticker: pd.DataFrame({field: values[field][:, j] for field in FIELDS},
+                                                index=pd.DatetimeIndex(times, name='Date'))
+                           for j, ticker in enumerate(self.tickers)}, axis=1)
+        return to_long(frame)
+
+    # Contents of the ring as a price panel (oldest bar first)
+    def to_panel(self):
+        rows = self._rows()
+        return PricePanel(self.times[rows], self.tickers, {f: np.asfortranarray(a[rows]) for f, a in self.arrays.items()})
+
+
+# Intraday bars of a universe: a ring buffer that is topped up from the download source of
+# the price store, and that hands the bars leaving it to the store in a coarser interval
+# The bars of the coarser interval are only handed over when they are complete: evicted bars of
+# the bucket that still has bars in the ring are kept in pending until the rest follows (after
+# a restart these few bars are not written)
+class IntradayFeed:
+    def __init__(self, tickers, interval, store, time_window=14, display_bars=MINUTES_PER_DAY):
+        if interval not in MINUTES:
+            raise ValueError(f"Not an intraday interval: {interval}")
+        self.interval = interval
+        self.store = store
+        self.ring = BarRing(tickers, ring_capacity(time_window, display_bars))
+        self.pending = None
+
+    # Download the bars since the newest bar in the ring (or enough bars to fill it)
+    # The tickers are downloaded in chunks by the FetchPlanner of the store, a chunk that still
+    # fails after its retries leaves its tickers without new bars until the next refresh
+    def refresh(self):
+        start = self.ring.last_time
+        if start is None:
+            days = int(np.ceil(self.ring.capacity * MINUTES[self.interval] / MINUTES_PER_DAY)) + 4
+            start = pd.Timestamp.now().normalize() - pd.Timedelta(days=days)
+        frames = [prices for _, _, _, prices in
+                  self.store.planner.fetch(self.store.source, {(start, None): self.ring.tickers}, self.interval)
+                  if prices is not None and len(prices)]
+        if not frames:
+            return
+        prices = with_factor(pd.concat(frames, ignore_index=True))
+        last = self.ring.last_time
+        compact_to = COMPACT_TO[self.interval]
+        factors = {ticker: factor for ticker, (factor, _) in
+                   corporate_actions(prices, dict.fromkeys(self.ring.tickers, last)).items()}
+        for ticker, factor in factors.items():
+            self.ring.rescale(ticker, factor)
+            if self.pending is not None:
+                rows = (self.pending['Ticker'] == ticker).to_numpy()
+                self.pending.loc[rows, ADJUSTED] *= factor
+        if factors:
+            self.store.rescale(factors, last, compact_to)
+        evicted = self.ring.extend(PricePanel.from_long(adjusted(prices), self.ring.tickers))
+        if evicted is not None and len(evicted):
+            self.pending = evicted if self.pending is None else pd.concat([self.pending, evicted], ignore_index=True)
+        if self.pending is None or self.ring.size == 0:
+            return
+        # complete buckets: older than the bucket of the oldest bar in the ring
+        oldest = bucket_start([self.ring.first_time], compact_to)[0]
+        complete = bucket_start(self.pending['Date'], compact_to) < oldest
+        if complete.any():
+            bars = self.pending[complete]
+            # bars that already are of the coarser interval are stored as they are
+            self.store.append(bars if self.interval == compact_to else resample_bars(bars, compact_to), compact_to)
+            self.pending = self.pending[~complete].reset_index(drop=True)
+
+    def panel(self):
+        return self.ring.to_panel()
@@ -0,0 +1,118 @@
+# Compact price panel for a universe of tickers
+# Instead of the wide yf.download(group_by='ticker') DataFrame with a (ticker, field) column
+# MultiIndex, every field (Open, High, Low, Close, Volume) is one contiguous 2D array of
+# shape (dates x tickers) in Fortran order, together with a shared date index and a
+# ticker -> column lookup. The prices of one ticker are therefore a contiguous column and
+# can be handed out as zero-copy views. Panels can be saved as .npy files and loaded
+# memory-mapped, so several processes can share them without reading them into memory.
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+class PricePanel:
+    # dates: DatetimeIndex, tickers: list of symbols, arrays: {field: (dates x tickers) array}
+    def __init__(self, dates, tickers, arrays):
+        self.dates = pd.DatetimeIndex(dates, name='Date')
+        self.tickers = [str(t) for t in tickers]
+        self.columns = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self.arrays = arrays
+
+    # Panel from the long (Date, Ticker, fields) layout of the price store
+    @classmethod
+    def from_long(cls, prices, tickers, dtype=np.float64):
+        tickers = [str(t) for t in tickers]
+        dates = pd.DatetimeIndex(np.sort(prices['Date'].unique()))
+        rows = dates.get_indexer(prices['Date'])
+        columns = pd.Index(tickers).get_indexer(prices['Ticker'])
+        known = columns >= 0
+        arrays = {}
+        for field in FIELDS:
+            array = np.full((len(dates), len(tickers)), np.nan, dtype=dtype, order='F')
+            array[rows[known], columns[known]] = prices[field].to_numpy()[known]
+            arrays[field] = array
+        return cls(dates, tickers, arrays)
+
+    # Panel from a yf.download(group_by='ticker') frame
+    @classmethod
+    def from_frame(cls, data, dtype=np.float64):
+        tickers = list(data.columns.get_level_values(0).unique())
+        arrays = {field: np.asfortranarray(
+            np.column_stack([data[t][field].to_numpy(dtype=dtype) for t in tickers])
+            if tickers else np.empty((len(data), 0), dtype=dtype)) for field in FIELDS}
+        return cls(data.index, tickers, arrays)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def __contains__(self, ticker):
+        return str(ticker) in self.columns
+
+    # Prices of one ticker as a (zero-copy) view
+    def column(self, field, ticker):
+        return self.arrays[field][:, self.columns[str(ticker)]]
+
+    # Prices of one ticker as a frame, so panel[ticker].Close works like data[ticker].Close
+    def __getitem__(self, ticker):
+        j = self.columns[str(ticker)]
+        return pd.DataFrame({field: self.arrays[field][:, j] for field in FIELDS}, index=self.dates, copy=False)
+
+    # One field of all (or some) tickers as a (dates x tickers) frame
+    # All tickers in panel order give a view of the array, other selections are copies
+    def matrix(self, field, tickers=None):
+        if tickers is None or [str(t) for t in tickers] == self.tickers:
+            return pd.DataFrame(self.arrays[field], index=self.dates, columns=self.tickers, copy=False)
+        positions = [self.columns[str(t)] for t in tickers]
+        return pd.DataFrame(self.arrays[field][:, positions], index=self.dates,
+                            columns=[str(t) for t in tickers], copy=False)
+
+    # Panel restricted to a date range (a view) and/or a set of tickers (a copy)
+    def select(self, tickers=None, start=None, end=None):
+        first = 0 if start is None else self.dates.searchsorted(pd.Timestamp(start))
+        last = len(self.dates) if end is None else self.dates.searchsorted(pd.Timestamp(end))
+        arrays = {field: array[first:last] for field, array in self.arrays.items()}
+        panel_tickers = self.tickers
+        if tickers is not None and [str(t) for t in tickers] != self.tickers:
+            panel_tickers = [str(t) for t in tickers]
+            positions = [self.columns.get(t, -1) for t in panel_tickers]
+            arrays = {field: _take_columns(array, positions) for field, array in arrays.items()}
+        return PricePanel(self.dates[first:last], panel_tickers, arrays)
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in self.arrays.values())
+
+    # Back to the yf.download(group_by='ticker') layout
+    def to_frame(self):
+        return pd.concat({ticker: self[ticker] for ticker in self.tickers}, axis=1)
+
+    # Save every field as a .npy file plus the dates and tickers
+    def save(self, folder):
+        os.makedirs(folder, exist_ok=True)
+        for field, array in self.arrays.items():
+            np.save(os.path.join(folder, field + '.npy'), np.asfortranarray(array))
+        np.save(os.path.join(folder, 'dates.npy'), self.dates.to_numpy(dtype='datetime64[ns]'))
+        with open(os.path.join(folder, 'tickers.json'), 'w') as f:
+            json.dump(self.tickers, f)
+
+    # Load a saved panel, by default memory-mapped (read-only)
+    @classmethod
+    def load(cls, folder, mmap_mode='r'):
+        with open(os.path.join(folder, 'tickers.json')) as f:
+            tickers = json.load(f)
+        dates = np.load(os.path.join(folder, 'dates.npy'))
+        arrays = {field: np.load(os.path.join(folder, field + '.npy'), mmap_mode=mmap_mode) for field in FIELDS}
+        return cls(dates, tickers, arrays)
+
+
+# Columns of a 2D array, NaN for unknown positions (-1)
+def _take_columns(array, positions):
+    positions = np.asarray(positions, dtype=int)
+    result = np.full((array.shape[0], len(positions)), np.nan, dtype=array.dtype, order='F')
+    known = positions >= 0
+    result[:, known] = array[:, positions[known]]
+    return result
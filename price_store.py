@@ -0,0 +1,564 @@
+# Local on-disk price store for the Hot Stocks apps
+# Prices are kept in one Parquet file per bar interval with one row per (Date, Ticker).
+# On every run only the bars after the last cached date are downloaded and appended,
+# a cold start fills the whole requested period with bulk downloads.
+# Large universes (thousands of tickers) are downloaded in chunks by a FetchPlanner: a few
+# chunks at a time, with retries and a pause between the calls. Every chunk is saved as a part
+# file of its own next to the cache and the parts are compacted into the cache at the end, so an
+# interrupted fill continues where it stopped. Symbols without any prices (e.g. delisted) are
+# skipped for a day.
+# The store keeps the prices as downloaded (not adjusted) together with an adjustment factor per
+# bar (adjusted price = price x Factor). When a top-up brings a split or a dividend, only the
+# factors of the older bars of that ticker change, so the history is never downloaded again.
+import json
+import os
+import random
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from panel import FIELDS, PricePanel
+# columns a source may deliver besides the FIELDS: the adjusted close and the corporate actions
+ADJ_CLOSE = 'Adj Close'
+ACTIONS = ['Dividends', 'Stock Splits']
+# prices that are adjusted, the volumes are kept as downloaded
+ADJUSTED = ['Open', 'High', 'Low', 'Close']
+CACHE_DIR = os.environ.get('HOT_STOCKS_CACHE',
+                           os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache'))
+
+
+# Translate a yfinance style period ('ytd', '5d', '3mo', '1y', '10y', 'max') into a start date
+def period_start(period, now=None):
+    now = pd.Timestamp.now().normalize() if now is None else pd.Timestamp(now).normalize()
+    if period == 'ytd':
+        return now.replace(month=1, day=1)
+    if period == 'max':
+        return pd.Timestamp('1970-01-01')
+    units = {'d': 'days', 'wk': 'weeks', 'mo': 'months', 'y': 'years'}
+    for suffix, unit in units.items():
+        if period.endswith(suffix) and period[:-len(suffix)].isdigit():
+            return now - pd.DateOffset(**{unit: int(period[:-len(suffix)])})
+    raise ValueError(f"Unknown period: {period}")
+
+
+# Download sources
+# A source is any callable source(tickers, start, end, interval) that returns a frame in the
+# yf.download(group_by='ticker') layout: dates as index and (ticker, field) columns
+# A source that also returns Adj Close (and Dividends / Stock Splits) columns delivers the prices
+# not adjusted, otherwise the prices are taken as they are (adjustment factor 1)
+
+# Default source: Yahoo Finance through the yfinance library (https://pypi.org/project/yfinance/)
+def yahoo_source(tickers, start, end, interval):
+    import yfinance as yf
+    return yf.download(
+        tickers=list(tickers),
+        start=start,
+        end=end,
+        interval=interval,
+        group_by='ticker',
+        auto_adjust=False,
+        actions=True,
+        prepost=True,
+        threads=True,
+        progress=False
+    )
+
+
+# Source serving prices from a local file (CSV or Parquet with Date, Ticker and field columns)
+# Used instead of Yahoo when there is no network, e.g. in tests or on the CI runners
+class FileSource:
+    def __init__(self, path):
+        self.path = path
+        self.prices = read_long(path)
+
+    def __call__(self, tickers, start, end, interval):
+        prices = self.prices[self.prices['Ticker'].isin([str(t) for t in tickers])]
+        if start is not None:
+            prices = prices[prices['Date'] >= pd.Timestamp(start)]
+        if end is not None:
+            prices = prices[prices['Date'] < pd.Timestamp(end)]
+        return to_wide(prices, tickers)
+
+
+# Read a long price table (Date, Ticker, fields) from CSV or Parquet
+def read_long(path):
+    if path.endswith('.csv'):
+        prices = pd.read_csv(path, parse_dates=['Date'])
+    else:
+        prices = pd.read_parquet(path)
+    prices['Ticker'] = prices['Ticker'].astype(str)
+    return prices
+
+
+# Turn a group_by='ticker' frame into the long (Date, Ticker, fields) layout of the store
+def to_long(data):
+    if data is None or data.empty:
+        return pd.DataFrame(columns=['Date', 'Ticker'] + FIELDS)
+    frames = []
+    for ticker in data.columns.get_level_values(0).unique():
+        extra = [column for column in [ADJ_CLOSE] + ACTIONS if column in data[ticker].columns]
+        prices = data[ticker].reindex(columns=FIELDS + extra).dropna(how='all', subset=FIELDS)
+        prices.index = _naive_index(prices.index)
+        prices.index.name = 'Date'
+        prices = prices.reset_index()
+        prices.insert(1, 'Ticker', str(ticker))
+        frames.append(prices)
+    return pd.concat(frames, ignore_index=True)
+
+
+# Turn the long layout back into the group_by='ticker' layout
+# Requested tickers without any prices are kept as empty (NaN) columns
+def to_wide(prices, tickers):
+    tickers = [str(t) for t in tickers]
+    fields = FIELDS + [column for column in [ADJ_CLOSE] + ACTIONS if column in prices.columns]
+    data = prices.set_index(['Date', 'Ticker'])[fields].unstack('Ticker')
+    data = data.swaplevel(axis=1).reindex(columns=pd.MultiIndex.from_product([tickers, fields]))
+    data.index.name = 'Date'
+    return data.sort_index()
+
+
+# Add the adjustment factor of every bar (Adj Close / Close) to downloaded prices (long layout)
+def with_factor(prices):
+    prices = prices.copy()
+    if ADJ_CLOSE in prices.columns:
+        factor = prices[ADJ_CLOSE] / prices['Close'].where(prices['Close'] > 0)
+        prices['Factor'] = factor.fillna(1.0)
+        prices = prices.drop(columns=ADJ_CLOSE)
+    elif 'Factor' not in prices.columns:
+        prices['Factor'] = 1.0
+    return prices
+
+
+# Adjusted prices (long layout without the factor)
+def adjusted(prices):
+    if 'Factor' not in prices.columns:
+        return prices
+    factor = prices['Factor'].to_numpy()
+    prices = prices.drop(columns='Factor')
+    for field in ADJUSTED:
+        prices[field] = prices[field].to_numpy() * factor
+    return prices
+
+
+# Splits and dividends in new bars (long layout with Dividends / Stock Splits columns) that are
+# newer than the last cached bar of their ticker, and the factor by which they change the older
+# bars: 1 / ratio for a split and 1 - dividend / previous close for a dividend, the way Yahoo
+# Finance adjusts its closes. last_dates: {ticker: last cached bar}
+# Returns {ticker: (factor, events)}, tickers without new events are left out
+def corporate_actions(new_prices, last_dates):
+    if not set(ACTIONS) & set(new_prices.columns):
+        return {}
+    actions = {}
+    for ticker, rows in new_prices.groupby('Ticker', sort=False):
+        last = last_dates.get(ticker)
+        if last is None or pd.isna(last):
+            continue
+        rows = rows.sort_values('Date')
+        split = rows['Stock Splits'].fillna(0).to_numpy() if 'Stock Splits' in rows else np.zeros(len(rows))
+        dividend = rows['Dividends'].fillna(0).to_numpy() if 'Dividends' in rows else np.zeros(len(rows))
+        previous_close = rows['Close'].shift(1).to_numpy()
+        new = (rows['Date'] > pd.Timestamp(last)).to_numpy() & ((split > 0) | (dividend > 0))
+        if not new.any():
+            continue
+        factor = 1.0
+        events = []
+        for i in np.flatnonzero(new):
+            if split[i] > 0:
+                factor /= split[i]
+            if dividend[i] > 0 and previous_close[i] > 0:
+                factor *= 1 - dividend[i] / previous_close[i]
+            events.append({'date': rows['Date'].iloc[i].isoformat(), 'split': float(split[i]),
+                           'dividend': float(dividend[i]), 'at': time.time()})
+        actions[ticker] = (factor, events)
+    return actions
+
+
+# Plan and run the downloads of many tickers
+# The tickers of every date range are split into chunks of chunk_size that are downloaded by
+# at most `workers` threads at a time (yfinance itself downloads the tickers of a chunk in
+# parallel). A failing chunk is retried with exponential backoff, calls start at least
+# `pause` seconds apart to stay below the rate limits of the source (0 turns the pause off).
+class FetchPlanner:
+    def __init__(self, chunk_size=200, workers=4, retries=2, backoff=1.0, pause=0.5):
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.pause = pause
+        self._lock = threading.Lock()
+        self._last_call = 0.0
+
+    # requests: {(start, end): tickers} -> list of (start, end, chunk)
+    def plan(self, requests):
+        return [(start, end, tickers[i:i + self.chunk_size])
+                for (start, end), tickers in requests.items()
+                for i in range(0, len(tickers), self.chunk_size)]
+
+    def _throttle(self):
+        with self._lock:
+            wait = self._last_call + self.pause - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self._last_call = time.monotonic()
+
+    # Download one chunk (long layout), retrying failed calls
+    def _download(self, source, start, end, chunk, interval):
+        for attempt in range(self.retries + 1):
+            self._throttle()
+            try:
+                return to_long(source(chunk, start, end, interval))
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt * (1 + random.random()))
+
+    # Download all chunks, yields (start, end, chunk, prices) as the chunks complete
+    # prices is None for chunks that still failed after all retries
+    def fetch(self, source, requests, interval):
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self._download, source, start, end, chunk, interval): (start, end, chunk)
+                       for start, end, chunk in self.plan(requests)}
+            for future in as_completed(futures):
+                start, end, chunk = futures[future]
+                try:
+                    prices = future.result()
+                except Exception:
+                    prices = None
+                yield start, end, chunk, prices
+
+
+# yfinance returns timezone aware timestamps for intraday bars, the store keeps local times
+def _naive_index(index):
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index
+
+
+class PriceStore:
+    # root: folder of the Parquet files, source: download source (see above)
+    # refresh_every: seconds after which cached tickers are topped up again, so that
+    # Streamlit reruns within this time don't download anything
+    # planner: FetchPlanner for the downloads, retry_failed_after: seconds during which
+    # symbols without any prices are not requested again
+    # The prices are handed out adjusted (see adjusted). The adjusted view is kept per ticker:
+    # a write of this store only computes the tickers it changed again, a cache written by
+    # someone else (e.g. the scheduler in another process) is read and adjusted in full
+    def __init__(self, root=CACHE_DIR, source=yahoo_source, refresh_every=15 * 60, planner=None,
+                 retry_failed_after=24 * 3600):
+        self.root = root
+        self.source = source
+        self.refresh_every = refresh_every
+        self.planner = FetchPlanner() if planner is None else planner
+        self.retry_failed_after = retry_failed_after
+        self._views = {}
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    # Lock of the cached prices of an interval: reading, merging and writing them again is one
+    # step, so that e.g. the intraday feeds of 1m and 5m bars that both append to the 15m bars in
+    # parallel threads don't lose each other's bars
+    def _lock(self, interval):
+        with self._locks_lock:
+            return self._locks.setdefault(interval, threading.RLock())
+
+    def _path(self, interval):
+        return os.path.join(self.root, f'prices_{interval}.parquet')
+
+    def _manifest_path(self, interval):
+        return os.path.join(self.root, f'prices_{interval}.json')
+
+    # Folder of the chunks that were downloaded but not yet compacted into the cache
+    def _parts_path(self, interval):
+        return os.path.join(self.root, f'prices_{interval}.parts')
+
+    # Part files of an interval, oldest first
+    def _parts(self, interval):
+        folder = self._parts_path(interval)
+        if not os.path.isdir(folder):
+            return []
+        return [os.path.join(folder, name) for name in sorted(os.listdir(folder)) if name.endswith('.parquet')]
+
+    # All cached prices of one interval in the long layout (not adjusted, with the Factor column)
+    # columns: only read these columns, e.g. ['Date', 'Ticker'] to see what is cached
+    # Parts of an interrupted update are read as well (see update)
+    def read(self, interval='1d', columns=None):
+        path = self._path(interval)
+        if os.path.exists(path):
+            # caches written before the factors were kept hold adjusted prices
+            prices = pd.read_parquet(path, columns=columns) if columns is not None \
+                else with_factor(pd.read_parquet(path))
+        else:
+            prices = pd.DataFrame({'Date': pd.Series(dtype='datetime64[ns]'),
+                                   'Ticker': pd.Series(dtype=str),
+                                   **{field: pd.Series(dtype=float) for field in FIELDS + ['Factor']}})
+            prices = prices if columns is None else prices[columns]
+        parts = self._parts(interval)
+        if parts:
+            prices = _merge(prices, [pd.read_parquet(part, columns=columns) for part in parts])
+        return prices
+
+    # Version of the cached prices of an interval (changes with every write)
+    def _stamp(self, interval):
+        path = self._path(interval)
+        parts = self._parts(interval)
+        stamp = '0'
+        if os.path.exists(path):
+            stat = os.stat(path)
+            stamp = f'{stat.st_mtime_ns}-{stat.st_size}'
+        return f'{stamp}_{os.path.basename(parts[-1])[:-8]}' if parts else stamp
+
+    def _read_manifest(self, interval):
+        path = self._manifest_path(interval)
+        if not os.path.exists(path):
+            return {'filled_from': {}, 'checked_at': 0, 'failed': {}, 'actions': {}}
+        with open(path) as f:
+            manifest = json.load(f)
+        manifest.setdefault('failed', {})
+        manifest.setdefault('actions', {})
+        return manifest
+
+    def _write_manifest(self, manifest, interval):
+        with open(self._manifest_path(interval) + '.tmp', 'w') as f:
+            json.dump(manifest, f)
+        os.replace(self._manifest_path(interval) + '.tmp', self._manifest_path(interval))
+
+    # Write all prices of an interval and remove the parts, which they contain
+    # changed: tickers whose bars or factors differ from the cache, their adjusted view is updated
+    # before: version of the cache the prices were read from (default: the current one)
+    def _write(self, prices, manifest, interval, changed=(), before=None):
+        os.makedirs(self.root, exist_ok=True)
+        # write to temporary files first so that a crash never leaves a half written cache
+        path = self._path(interval)
+        with self._lock(interval):
+            before = self._stamp(interval) if before is None else before
+            prices.to_parquet(path + '.tmp', index=False)
+            os.replace(path + '.tmp', path)
+            self._write_manifest(manifest, interval)
+            for part in self._parts(interval):
+                os.remove(part)
+            self._update_view(interval, before, prices, changed)
+
+    # Save the bars of one downloaded chunk as a part of its own, without rewriting the cache
+    def _write_part(self, prices, manifest, interval):
+        folder = self._parts_path(interval)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f'{time.time_ns()}-{os.getpid()}.parquet')
+        prices.to_parquet(path + '.tmp', index=False)
+        os.replace(path + '.tmp', path)
+        self._write_manifest(manifest, interval)
+
+    # Download everything that is missing for the tickers since start and append it to the cache
+    # Tickers that need the same date range are downloaded together (in chunks, see FetchPlanner)
+    # Splits and dividends after the last cached bar of a ticker rescale its cached bars and are
+    # logged in the manifest (see actions)
+    # Only the dates and tickers of the cache are read, unless something has to be downloaded
+    # Updates of the same interval run one at a time
+    def update(self, tickers, start, end=None, interval='1d'):
+        with self._lock(interval):
+            self._update(tickers, start, end, interval)
+
+    def _update(self, tickers, start, end, interval):
+        tickers = [str(t) for t in tickers]
+        start = pd.Timestamp(start)
+        cached = self.read(interval, columns=['Date', 'Ticker'])
+        manifest = self._read_manifest(interval)
+        filled_from = manifest['filled_from']
+        failed = manifest['failed']
+        last_date = cached.groupby('Ticker')['Date'].max()
+        # the bars cached before this update, only these are rescaled by new corporate actions
+        cached_from = cached.groupby('Ticker')['Date'].min()
+        del cached
+        top_up = time.time() - manifest['checked_at'] >= self.refresh_every
+
+        requests = {}
+        cold = set()
+        for ticker in tickers:
+            if ticker not in filled_from:
+                if failed.get(ticker, {}).get('reason') == 'no data' \
+                        and time.time() - failed[ticker]['at'] < self.retry_failed_after:
+                    continue  # e.g. delisted, don't ask for it on every run
+                # cold start: bulk fill of the whole period
+                requests.setdefault((start, end), []).append(ticker)
+                cold.add(ticker)
+                continue
+            if start < pd.Timestamp(filled_from[ticker]):
+                # older history than cached is requested
+                requests.setdefault((start, pd.Timestamp(filled_from[ticker])), []).append(ticker)
+            if top_up:
+                # the last cached bar is downloaded again because it may have been incomplete
+                last = last_date.get(ticker, pd.Timestamp(filled_from[ticker]))
+                requests.setdefault((last.normalize(), end), []).append(ticker)
+
+        if not requests:
+            return
+        before = self._stamp(interval)
+        prices = self.read(interval)
+        downloaded = []
+        changed = set()
+        for fetch_start, fetch_end, chunk, new_prices in self.planner.fetch(self.source, requests, interval):
+            if new_prices is None:
+                # the chunk failed: its tickers are requested again on the next update
+                for ticker in chunk:
+                    failed[ticker] = {'at': time.time(), 'reason': 'error'}
+                continue
+            received = set(new_prices['Ticker'])
+            if cold.intersection(chunk) and not received:
+                # nothing at all for a chunk of new tickers is more likely a blocked request
+                for ticker in chunk:
+                    failed[ticker] = {'at': time.time(), 'reason': 'error'}
+                continue
+            new_prices = with_factor(new_prices)
+            actions = corporate_actions(new_prices, last_date)
+            new_prices = new_prices.drop(columns=ACTIONS, errors='ignore')
+            for ticker, (factor, events) in actions.items():
+                first_new = new_prices.loc[new_prices['Ticker'] == ticker, 'Date'].min()
+                prices = _rescale(prices, ticker, factor, cached_from[ticker], first_new)
+                manifest['actions'].setdefault(ticker, []).extend(events)
+            downloaded.append(new_prices)
+            changed |= received
+            for ticker in chunk:
+                if ticker in cold and ticker not in received:
+                    failed[ticker] = {'at': time.time(), 'reason': 'no data'}
+                    continue
+                failed.pop(ticker, None)
+                # only a fill or backfill (not a top-up) extends the cached history to start
+                if fetch_start == start and (ticker not in filled_from or start < pd.Timestamp(filled_from[ticker])):
+                    filled_from[ticker] = start.isoformat()
+            # save every chunk as a part, so an interrupted fill continues from here
+            # (the part also holds the rescaled older bars of the tickers with new corporate actions)
+            self._write_part(_merge(prices[prices['Ticker'].isin(list(actions))], [new_prices]), manifest, interval)
+
+        if top_up:
+            manifest['checked_at'] = time.time()
+        # compact the parts into the cache
+        self._write(_merge(prices, downloaded), manifest, interval, changed, before)
+
+    # Symbols whose last download failed: {ticker: {'at': timestamp, 'reason': 'error' or 'no data'}}
+    def failed(self, interval='1d'):
+        return self._read_manifest(interval)['failed']
+
+    # Splits and dividends found on top-ups: {ticker: [{'date', 'split', 'dividend', 'at'}]}
+    def actions(self, interval='1d'):
+        return self._read_manifest(interval)['actions']
+
+    # Add bars (long layout) to the cache without downloading anything, e.g. the bars that
+    # dropped out of an intraday ring buffer (see intraday.py), which are already adjusted
+    def append(self, new_prices, interval):
+        with self._lock(interval):
+            self._write(_merge(self.read(interval), [with_factor(new_prices)]), self._read_manifest(interval),
+                        interval, set(new_prices['Ticker'].astype(str)))
+
+    # Multiply the adjustment factors of the cached bars of some tickers before a date,
+    # factors: {ticker: factor}, e.g. after a split found in intraday bars (see intraday.py)
+    def rescale(self, factors, before, interval):
+        with self._lock(interval):
+            prices = self.read(interval)
+            for ticker, factor in factors.items():
+                prices = _rescale(prices, ticker, factor, None, before)
+            self._write(prices, self._read_manifest(interval), interval, set(factors))
+
+    # Adjusted view of the cached prices: (version, empty frame with the columns, {ticker: adjusted bars})
+    # Only computed again in full when the cache file was changed by someone else
+    def _adjusted_view(self, interval):
+        stamp = self._stamp(interval)
+        view = self._views.get(interval)
+        if view is None or view[0] != stamp:
+            prices = adjusted(self.read(interval))
+            view = self._views[interval] = (stamp, prices.iloc[:0],
+                                            dict(iter(prices.groupby('Ticker', sort=False))))
+        return view
+
+    # After a write of this store: compute the view of the changed tickers again and keep the
+    # others, unless the view was already out of date before the write
+    # A new view replaces the old one, so a thread that is reading the old one is not disturbed
+    def _update_view(self, interval, before, prices, changed):
+        view = self._views.get(interval)
+        if view is None or view[0] != before:
+            self._views.pop(interval, None)
+            return
+        rows = dict(view[2])
+        for ticker in changed:
+            rows.pop(ticker, None)
+        if changed:
+            selected = adjusted(prices[prices['Ticker'].isin(list(changed))])
+            rows.update(iter(selected.groupby('Ticker', sort=False)))
+        self._views[interval] = (self._stamp(interval), view[1], rows)
+
+    # Adjusted bars of the tickers since start (long layout)
+    def _adjusted(self, tickers, start, end, interval):
+        _, empty, rows = self._adjusted_view(interval)
+        frames = [rows[t] for t in dict.fromkeys(str(t) for t in tickers) if t in rows]
+        return _select(pd.concat(frames, ignore_index=True) if frames else empty, tickers, start, end)
+
+    # Prices of the tickers since start in the yf.download(group_by='ticker') layout
+    # refresh=False only reads the cache, e.g. for offline runs
+    def load(self, tickers, start, end=None, interval='1d', refresh=True):
+        if refresh:
+            self.update(tickers, start, end, interval)
+        return to_wide(self._adjusted(tickers, start, end, interval), tickers)
+
+    # Prices of the tickers since start as a PricePanel (see panel.py)
+    # mmap=True serves them from a memory-mapped panel of the whole cache, which is only
+    # saved again when the cached prices changed (selecting a subset of tickers makes a copy)
+    def load_panel(self, tickers, start, end=None, interval='1d', refresh=True, dtype=np.float64, mmap=False):
+        if refresh:
+            self.update(tickers, start, end, interval)
+        if mmap:
+            return self._mapped_panel(interval, dtype).select(tickers, start, end)
+        return PricePanel.from_long(self._adjusted(tickers, start, end, interval), tickers, dtype)
+
+    # Memory-mapped panel of the whole cache, e.g. shared by several processes
+    # Every version of the cache is saved to a folder of its own (panel_<interval>/<version>) that is
+    # written under a temporary name and renamed when complete, so files that are mapped somewhere
+    # are never written again. Older versions are removed, which keeps existing maps valid on POSIX
+    # (removing a mapped file fails on Windows, the folder is then removed by a later version).
+    # A new version is built from the adjusted view, so after a write of this store only the
+    # tickers it changed are adjusted again
+    def _mapped_panel(self, interval, dtype):
+        root = os.path.join(self.root, f'panel_{interval}')
+        stamp, empty, rows = self._adjusted_view(interval)
+        version = f'{stamp}-{np.dtype(dtype).name}'
+        folder = os.path.join(root, version)
+        if not os.path.exists(folder):
+            prices = pd.concat(rows.values(), ignore_index=True) if rows else empty
+            temporary = f'{folder}.tmp-{os.getpid()}-{threading.get_ident()}'
+            PricePanel.from_long(prices, sorted(rows), dtype).save(temporary)
+            del prices
+            try:
+                os.rename(temporary, folder)
+            except OSError:
+                shutil.rmtree(temporary, ignore_errors=True)  # saved by another process meanwhile
+            for name in os.listdir(root):
+                if not name.startswith(stamp + '-') and '.tmp-' not in name:
+                    shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+        return PricePanel.load(folder, mmap_mode='r')
+
+
+# Combine cached and new bars, newer downloads of the same bar win
+def _merge(prices, new_prices):
+    prices = pd.concat([prices] + list(new_prices), ignore_index=True)
+    prices = prices.drop_duplicates(['Date', 'Ticker'], keep='last')
+    return prices.sort_values(['Ticker', 'Date'], ignore_index=True)
+
+
+# Multiply the adjustment factors of the bars of a ticker from start (None: all) up to before end
+def _rescale(prices, ticker, factor, start, end):
+    rows = (prices['Ticker'] == ticker) & (prices['Date'] < pd.Timestamp(end))
+    if start is not None:
+        rows &= prices['Date'] >= pd.Timestamp(start)
+    prices = prices.copy()
+    prices.loc[rows, 'Factor'] *= factor
+    return prices
+
+
+# Rows of the long layout for some tickers and dates
+def _select(prices, tickers, start, end=None):
+    selected = prices['Ticker'].isin([str(t) for t in tickers]) & (prices['Date'] >= pd.Timestamp(start))
+    if end is not None:
+        selected &= prices['Date'] < pd.Timestamp(end)
+    return prices[selected]
@@ -0,0 +1,135 @@
+# Stage timers for the Hot Stocks apps and scripts
+# Every stage (constituent load, price fetch, indicator compute, screening, rendering) records
+# its wall time and the number of rows it processed, e.g.
+#   profiler = Profiler(enabled=True)
+#   with profiler.stage('price fetch') as stage:
+#       data = store.load(...)
+#       stage.rows = len(data)
+# A disabled profiler only hands out a dummy stage, so the timers cost next to nothing.
+# With track_memory=True (or HOT_STOCKS_PROFILE=memory) a stage also records its peak memory with
+# tracemalloc. Tracing slows
+# down every allocation of the process, so it is started by the stage and stopped again when
+# the stage ends. tracemalloc is process wide: a stage that runs while another stage (of any
+# profiler, in any thread) is tracing, or while tracemalloc was started elsewhere, has no peak
+# memory (None) instead of a peak that belongs to someone else.
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+_tracing_lock = threading.Lock()
+
+
+class Stage:
+    def __init__(self, name):
+        self.name = name
+        self.rows = None
+        self.seconds = None
+        self.peak_memory = None
+
+    def to_dict(self):
+        return {'stage': self.name, 'seconds': self.seconds, 'rows': self.rows,
+                'peak_memory_bytes': self.peak_memory}
+
+
+class _StageTimer:
+    def __init__(self, profiler, name, rows):
+        self.profiler = profiler
+        self.stage = Stage(name)
+        self.stage.rows = rows
+
+    def __enter__(self):
+        if self.profiler.on_stage is not None:
+            self.profiler.on_stage(self.stage.name)
+        self.tracing = False
+        if self.profiler.track_memory:
+            # the lock is held until the stage ends: only one stage traces at a time
+            if _tracing_lock.acquire(blocking=False):
+                self.tracing = not tracemalloc.is_tracing()
+                if self.tracing:
+                    tracemalloc.start()
+                else:
+                    _tracing_lock.release()
+        self.start = time.perf_counter()
+        return self.stage
+
+    def __exit__(self, *exc):
+        self.stage.seconds = time.perf_counter() - self.start
+        if self.tracing:
+            self.stage.peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            _tracing_lock.release()
+        self.profiler.stages.append(self.stage)
+        return False
+
+
+class _NullTimer:
+    stage = Stage('disabled')
+
+    def __enter__(self):
+        return self.stage
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Profiler:
+    # enabled defaults to the HOT_STOCKS_PROFILE environment variable (any value but 0)
+    # track_memory: also record the peak memory of every stage (tracemalloc, slows down allocations),
+    # defaults to HOT_STOCKS_PROFILE=memory
+    # on_stage: called with the name of every stage that starts, e.g. to show the progress
+    def __init__(self, enabled=None, track_memory=None, on_stage=None):
+        setting = os.environ.get('HOT_STOCKS_PROFILE', '')
+        if enabled is None:
+            enabled = setting not in ('', '0')
+        if track_memory is None:
+            track_memory = setting == 'memory'
+        self.enabled = enabled
+        self.track_memory = track_memory
+        self.on_stage = on_stage
+        self.stages = []
+
+    def stage(self, name, rows=None):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self, name, rows)
+
+    # Add a measurement that was not taken with stage(), e.g. the time to the first paint of an app
+    def record(self, name, seconds, rows=None):
+        if self.enabled:
+            stage = Stage(name)
+            stage.seconds = seconds
+            stage.rows = rows
+            self.stages.append(stage)
+
+    def records(self):
+        return [stage.to_dict() for stage in self.stages]
+
+    def to_json(self):
+        return json.dumps(self.records(), indent=2)
+
+    # Prometheus text exposition format, one gauge per measurement and stage
+    def to_prometheus(self, prefix='hot_stocks'):
+        metrics = [('stage_seconds', 'seconds', 'Wall time of the stage in seconds'),
+                   ('stage_rows', 'rows', 'Rows processed by the stage'),
+                   ('stage_peak_memory_bytes', 'peak_memory', 'Peak traced memory of the stage in bytes')]
+        lines = []
+        for metric, attribute, description in metrics:
+            lines.append(f'# HELP {prefix}_{metric} {description}')
+            lines.append(f'# TYPE {prefix}_{metric} gauge')
+            for stage in self.stages:
+                value = getattr(stage, attribute)
+                if value is not None:
+                    label = stage.name.replace('\\', '\\\\').replace('"', '\\"')
+                    lines.append(f'{prefix}_{metric}{{stage="{label}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+    # Write the timings as JSON or (for a .prom/.txt file) in the Prometheus text format
+    def save(self, path):
+        text = self.to_prometheus() if path.endswith(('.prom', '.txt')) else self.to_json()
+        with open(path, 'w') as f:
+            f.write(text)
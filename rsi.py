@@ -0,0 +1,158 @@
+# RSI engine shared by the Hot Stocks apps
+# compute_rsi works on the close prices of a single ticker, compute_rsi_matrix
+# works on the close prices of the whole universe (dates x tickers) at once and
+# RSIState keeps a running RSI per ticker that is updated one bar at a time
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+
+# Function to calculate RSI
+# Time window of 14 days is most used in theory and practice
+def compute_rsi(data, time_window):
+    diff = data.diff(1).dropna()  # get daily stock price difference
+    up_chg = 0 * diff  # preserve dimensions off diff values
+    down_chg = 0 * diff  # preserve dimensions off diff values
+    # up_change is equal to the positive difference, otherwise equal to zero
+    up_chg[diff > 0] = diff[diff > 0]
+    # up_change is equal to the negative difference, otherwise equal to zero
+    down_chg[diff < 0] = diff[diff < 0]
+    # values are related to exponential decay
+    # we set com=time_window-1 so we get decay alpha=1/time_window
+    up_chg_avg = up_chg.ewm(com=time_window - 1,
+                            min_periods=time_window).mean()
+    down_chg_avg = down_chg.ewm(
+        com=time_window - 1, min_periods=time_window).mean()
+    rs = abs(up_chg_avg/down_chg_avg)
+    rsi = 100 - 100/(1+rs)
+    return rsi
+
+
+# Take one price field (Close, High, ...) of all tickers out of a yf.download(group_by='ticker') frame
+# or a PricePanel (see panel.py). The result has one column per ticker and the same index as the data
+def field_matrix(data, tickers, field):
+    if hasattr(data, 'matrix'):
+        return data.matrix(field, tickers)
+    return pd.DataFrame({str(t): data[str(t)][field] for t in tickers}, index=data.index)
+
+
+def close_matrix(data, tickers):
+    return field_matrix(data, tickers, 'Close')
+
+
+# RSI of all columns from a frame of price differences
+# Gaps (NaN differences) are skipped with ignore_na=True, which gives the same
+# weights as dropping them first like compute_rsi does for a single ticker
+def rsi_from_diff(diff, time_window):
+    return rsi_from_changes(diff.clip(lower=0), diff.clip(upper=0).abs(), diff.notna(), time_window)
+
+
+# RSI from the up changes and the (positive) down changes of the prices
+# valid marks the days with a price difference
+def rsi_from_changes(up_chg, down_chg, valid, time_window):
+    up_chg_avg = up_chg.ewm(com=time_window - 1, min_periods=time_window,
+                            ignore_na=True).mean()
+    down_chg_avg = down_chg.ewm(com=time_window - 1, min_periods=time_window,
+                                ignore_na=True).mean()
+    rsi = 100 - 100/(1 + up_chg_avg/down_chg_avg)
+    # no RSI on days without a price difference (same as the dropna in compute_rsi)
+    return rsi.where(valid)
+
+
+# Latest RSI of every ticker, i.e. the value on its last day with a price difference
+# (tickers without any price difference get NaN)
+def latest_rsi(rsi, diff):
+    valid = diff.notna().to_numpy()
+    if len(valid) == 0:
+        return pd.Series(np.nan, index=rsi.columns, name='RSI')
+    last_row = len(valid) - 1 - np.argmax(valid[::-1], axis=0)
+    values = rsi.to_numpy()[last_row, np.arange(valid.shape[1])]
+    values = np.where(valid.any(axis=0), values, np.nan)
+    return pd.Series(values, index=rsi.columns, name='RSI')
+
+
+# Function to calculate the RSI of the whole universe in one pass
+# closes: frame of close prices with dates as rows and tickers as columns
+# returns the full RSI matrix (same shape as closes) and the latest RSI per ticker
+def compute_rsi_matrix(closes, time_window):
+    diff = closes.diff(1)
+    rsi = rsi_from_diff(diff, time_window)
+    return rsi, latest_rsi(rsi, diff)
+
+
+# Running RSI of a single ticker for intraday updates
+# Holds the average gain, the average loss and the last close, so folding in a new price
+# takes constant time instead of recomputing the whole history like compute_rsi.
+# The averages follow exactly the same recursion as the ewm(com=time_window-1) in
+# compute_rsi, so after the warm-up of time_window price differences both give the same RSI.
+class RSIState:
+    def __init__(self, time_window=14, avg_gain=None, avg_loss=None, weight=0.0, count=0,
+                 last_close=None):
+        self.time_window = time_window
+        self.avg_gain = avg_gain
+        self.avg_loss = avg_loss
+        self.weight = weight  # sum of the decayed ewm weights of all previous differences
+        self.count = count  # number of price differences seen so far
+        self.last_close = last_close
+
+    # Warm up the state with the close prices of a ticker (oldest first)
+    @classmethod
+    def from_history(cls, closes, time_window=14):
+        state = cls(time_window)
+        for close in closes:
+            state.update(close)
+        return state
+
+    # Fold in a new close price and return the current RSI
+    # (a missing price leaves the averages untouched and returns the previous RSI)
+    def update(self, close):
+        close = float(close)
+        if self.last_close is not None and close == close and self.last_close == self.last_close:
+            diff = close - self.last_close
+            gain = diff if diff > 0 else 0.0
+            loss = -diff if diff < 0 else 0.0
+            if self.count == 0:
+                self.avg_gain, self.avg_loss, self.weight = gain, loss, 1.0
+            else:
+                # same update as pandas' ewm with adjust=True and alpha=1/time_window
+                self.weight *= 1 - 1 / self.time_window
+                if self.avg_gain != gain:
+                    self.avg_gain = (self.weight * self.avg_gain + gain) / (self.weight + 1)
+                if self.avg_loss != loss:
+                    self.avg_loss = (self.weight * self.avg_loss + loss) / (self.weight + 1)
+                self.weight += 1
+            self.count += 1
+        # a missing price also makes the next difference missing, like diff().dropna()
+        self.last_close = close
+        return self.rsi
+
+    @property
+    def rsi(self):
+        if self.count < self.time_window:
+            return float('nan')
+        if self.avg_loss == 0:
+            return 100.0 if self.avg_gain > 0 else float('nan')
+        return 100 - 100 / (1 + self.avg_gain / self.avg_loss)
+
+    def to_dict(self):
+        return {'time_window': self.time_window, 'avg_gain': self.avg_gain, 'avg_loss': self.avg_loss,
+                'weight': self.weight, 'count': self.count, 'last_close': self.last_close}
+
+    @classmethod
+    def from_dict(cls, state):
+        return cls(**state)
+
+
+# Save and load the RSI states of all tickers ({ticker: RSIState}) as JSON
+# so that intraday updates can continue after a restart
+def save_rsi_states(states, path):
+    with open(path + '.tmp', 'w') as f:
+        json.dump({ticker: state.to_dict() for ticker, state in states.items()}, f)
+    os.replace(path + '.tmp', path)
+
+
+def load_rsi_states(path):
+    with open(path) as f:
+        return {ticker: RSIState.from_dict(state) for ticker, state in json.load(f).items()}
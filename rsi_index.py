@@ -0,0 +1,98 @@
+# In-memory index of precomputed RSI series
+# The RSI of every ticker for a set of time windows is computed once per data refresh (one
+# matrix pass per window, see rsi.compute_rsi_matrix) and kept as one read-only array per
+# (ticker, window). Switching the ticker or the window in the apps is then a dictionary lookup.
+# The index holds at most `budget` bytes: the least recently used series are evicted first and
+# a series that is not (or no longer) in the index is computed from the closes of its ticker.
+# The budget defaults to the HOT_STOCKS_RSI_BUDGET_MB environment variable (64 MB).
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from rsi import compute_rsi_matrix
+
+WINDOWS = (7, 14, 21)
+BUDGET = int(float(os.environ.get('HOT_STOCKS_RSI_BUDGET_MB', 64)) * 2 ** 20)
+
+
+class RSIIndex:
+    # closes: frame of close prices (dates x tickers), the RSI series have the same dates
+    def __init__(self, closes, windows=WINDOWS, budget=BUDGET):
+        self.closes = closes
+        self.windows = tuple(windows)
+        self.budget = budget
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._series = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Compute the RSI of all tickers for every window (a window whose matrix is given in
+    # computed, e.g. {14: rsi}, is not computed again) and fill the index up to the budget
+    def build(self, computed=None):
+        computed = {} if computed is None else computed
+        row_bytes = len(self.closes) * np.dtype(np.float64).itemsize
+        for window in self.windows:
+            if self.nbytes + row_bytes > self.budget:
+                break
+            rsi = computed[window] if window in computed else compute_rsi_matrix(self.closes, window)[0]
+            values = np.asfortranarray(rsi.to_numpy(dtype=np.float64))
+            for j, ticker in enumerate(rsi.columns):
+                if self.nbytes + row_bytes > self.budget:
+                    break
+                self._put((str(ticker), window), values[:, j].copy())
+        return self
+
+    def _put(self, key, series):
+        series.setflags(write=False)
+        with self._lock:
+            if key in self._series:
+                return
+            self._series[key] = series
+            self.nbytes += series.nbytes
+            # evict the least recently used series, but keep at least the new one
+            while self.nbytes > self.budget and len(self._series) > 1:
+                _, evicted = self._series.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+
+    # RSI series of a ticker (read-only array with one value per date of the closes)
+    def get(self, ticker, window=14):
+        key = (str(ticker), window)
+        with self._lock:
+            series = self._series.get(key)
+            if series is not None:
+                self._series.move_to_end(key)
+                self.hits += 1
+                return series
+            self.misses += 1
+        rsi, _ = compute_rsi_matrix(self.closes[[str(ticker)]], window)
+        series = rsi[str(ticker)].to_numpy(dtype=np.float64).copy()
+        self._put(key, series)
+        return series
+
+    # RSI of some tickers as a (dates x tickers) frame, e.g. for an export
+    # The series in the index are used as they are (without changing the order of eviction) and
+    # the others are computed in one pass without being added, so a large export does not push
+    # the series of the charts out of the index
+    def matrix(self, tickers, window=14):
+        tickers = [str(t) for t in tickers]
+        with self._lock:
+            cached = {t: self._series[(t, window)] for t in tickers if (t, window) in self._series}
+        missing = [t for t in tickers if t not in cached]
+        if missing:
+            rsi, _ = compute_rsi_matrix(self.closes[missing], window)
+            cached.update({t: rsi[t].to_numpy(dtype=np.float64) for t in missing})
+        return pd.DataFrame({t: cached[t] for t in tickers}, index=self.closes.index, columns=tickers)
+
+    def __contains__(self, key):
+        return (str(key[0]), key[1]) in self._series
+
+    def __len__(self):
+        return len(self._series)
+
+    def stats(self):
+        return {'series': len(self._series), 'windows': list(self.windows), 'megabytes': self.nbytes / 2 ** 20,
+                'budget_megabytes': self.budget / 2 ** 20, 'hits': self.hits, 'misses': self.misses}
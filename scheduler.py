@@ -0,0 +1,120 @@
+# Parallel screening of several universes and timeframes
+# A job is a (universe, interval, period) combination, e.g. ('sp500', '1h', '60d').
+# The bars of all jobs with the same interval and period are loaded once (for the union of
+# their tickers) and written to a memory-mapped .npy file. The screening itself is split into
+# chunks of tickers that run in a process pool; every worker maps the file instead of
+# receiving a pickled copy of the prices. All hot lists are merged into one report, e.g.
+#   python scheduler.py --jobs sp100:1d:ytd sp500:1d:ytd sp500:1h:60d watchlist.csv:1wk:5y
+import argparse
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from price_store import PriceStore, FileSource, period_start
+from rsi import close_matrix, compute_rsi_matrix
+from screener import hot_list
+from universes import load_universe, name_column
+
+CHUNK_SIZE = 100
+
+
+# Parse 'universe:interval:period' (interval and period default to 1d and ytd)
+def parse_job(text):
+    parts = text.rsplit(':', 2) if text.count(':') >= 2 else text.split(':')
+    universe = parts[0]
+    interval = parts[1] if len(parts) > 1 else '1d'
+    period = parts[2] if len(parts) > 2 else 'ytd'
+    return universe, interval, period
+
+
+# Screen one chunk of tickers in a worker process
+# path: memory-mapped close matrix (dates x all tickers), columns: the columns of this chunk
+def screen_chunk(path, columns, tickers, time_window, low, high):
+    matrix = np.load(path, mmap_mode='r')
+    closes = pd.DataFrame(matrix[:, columns], columns=tickers)
+    _, current_rsi = compute_rsi_matrix(closes, time_window)
+    return hot_list(current_rsi, closes, low, high)
+
+
+# Write the close prices of a group of jobs to a memory-mappable file
+# Fortran order keeps every ticker's prices contiguous, so a chunk of columns is one read
+def write_close_matrix(closes, folder, name):
+    path = os.path.join(folder, name + '.npy')
+    np.save(path, np.asfortranarray(closes.to_numpy(dtype=np.float64)))
+    return path
+
+
+# Run all jobs and return one report with the hot stocks of every job
+def run_jobs(jobs, time_window=14, low=30, high=70, store=None, refresh=True, workers=None,
+             chunk_size=CHUNK_SIZE):
+    store = PriceStore() if store is None else store
+    constituents = {universe: load_universe(universe) for universe, _, _ in jobs}
+    groups = {}
+    for universe, interval, period in jobs:
+        groups.setdefault((interval, period), []).append(universe)
+
+    reports = []
+    with tempfile.TemporaryDirectory() as folder, ProcessPoolExecutor(max_workers=workers) as pool:
+        tasks = []
+        for (interval, period), universes in groups.items():
+            # one download and one shared price matrix per timeframe
+            tickers = list(dict.fromkeys(t for u in universes for t in constituents[u]['Symbol'].astype(str)))
+            data = store.load_panel(tickers, start=period_start(period), interval=interval, refresh=refresh)
+            path = write_close_matrix(close_matrix(data, tickers), folder, f'{interval}_{period}')
+            position = {ticker: i for i, ticker in enumerate(tickers)}
+            for universe in universes:
+                symbols = list(dict.fromkeys(constituents[universe]['Symbol'].astype(str)))
+                for start in range(0, len(symbols), chunk_size):
+                    chunk = symbols[start:start + chunk_size]
+                    future = pool.submit(screen_chunk, path, [position[t] for t in chunk], chunk,
+                                         time_window, low, high)
+                    tasks.append((universe, interval, period, future))
+
+        for universe, interval, period, future in tasks:
+            hot = future.result()
+            names = constituents[universe].set_index('Symbol')[name_column(universe)]
+            hot.insert(0, 'Name', names.reindex(hot.index).to_numpy())
+            hot = hot.reset_index()
+            hot.insert(0, 'Period', period)
+            hot.insert(0, 'Interval', interval)
+            hot.insert(0, 'Universe', universe)
+            reports.append(hot)
+
+    if not reports:
+        return pd.DataFrame(columns=['Universe', 'Interval', 'Period', 'Symbol', 'Name', 'RSI', 'Close', 'Signal'])
+    return pd.concat(reports, ignore_index=True)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Screen several universes and timeframes in parallel")
+    parser.add_argument('--jobs', nargs='+', default=['sp100:1d:ytd', 'sp500:1d:ytd'],
+                        help="jobs as universe:interval:period, e.g. sp500:1h:60d (default: sp100 and sp500, daily, YTD)")
+    parser.add_argument('--window', type=int, default=14, help="RSI time window (default: 14)")
+    parser.add_argument('--low', type=float, default=30, help="oversold threshold (default: 30)")
+    parser.add_argument('--high', type=float, default=70, help="overbought threshold (default: 70)")
+    parser.add_argument('--workers', type=int, help="number of worker processes (default: number of cores)")
+    parser.add_argument('--output', help="CSV file for the report (default: stdout)")
+    parser.add_argument('--cache', help="folder of the local price store")
+    parser.add_argument('--prices', help="read prices from this CSV/Parquet file instead of Yahoo Finance")
+    parser.add_argument('--offline', action='store_true', help="only use the cached prices")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    store_args = {}
+    if args.cache:
+        store_args['root'] = args.cache
+    if args.prices:
+        store_args['source'] = FileSource(args.prices)
+    report = run_jobs([parse_job(job) for job in args.jobs], args.window, args.low, args.high,
+                      PriceStore(**store_args), refresh=not args.offline, workers=args.workers)
+    report.to_csv(args.output if args.output else sys.stdout, index=False)
+
+
+if __name__ == '__main__':
+    main()
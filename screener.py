@@ -0,0 +1,157 @@
+# Headless Hot Stocks screener
+# The data loading, RSI calculation and hot stock selection of the apps without streamlit
+# and plotly, so the screen can run from the command line or a cron job, e.g.
+#   python screener.py --universe sp500 --window 14 --low 30 --high 70 --output hot.csv
+#   python screener.py --universe sp500 --rule "rsi14 < 30 and close < bb_lower"
+# With --record the zones of all tickers are saved and the zone changes logged (see alerts.py)
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+from alerts import AlertStore, zone_table
+from indicators import IndicatorPipeline, rule_names
+from price_store import PriceStore, FetchPlanner, FileSource, period_start
+from profiling import Profiler
+from rsi import compute_rsi_matrix, close_matrix
+from universes import UNIVERSES, load_universe, name_column
+
+OUTPUT_FORMATS = ['csv', 'json', 'parquet']
+
+
+# Hot stocks out of the current RSI of all tickers: current RSI either <low (=oversold)
+# or >high (=overbought), together with the last close price of the ticker
+def hot_list(current_rsi, closes, low=30, high=70):
+    hot = current_rsi[(current_rsi < low) | (current_rsi > high)]
+    return pd.DataFrame({
+        'RSI': hot,
+        'Close': closes[hot.index].ffill().iloc[-1] if len(closes) else float('nan'),
+        'Signal': ['oversold' if rsi < low else 'overbought' for rsi in hot],
+    }, index=hot.index.rename('Symbol'))
+
+
+# Run the screen on downloaded prices (a PricePanel or the yf.download(group_by='ticker') layout)
+# returns the full RSI matrix of all symbols and the hot list
+def run_screen(data, symbols, time_window=14, low=30, high=70):
+    closes = close_matrix(data, symbols)
+    rsi_data, current_rsi = compute_rsi_matrix(closes, time_window)
+    return rsi_data, hot_list(current_rsi, closes, low, high)
+
+
+# Stocks that currently satisfy a screening rule (see indicators.py), together with the
+# latest values of all indicators used in the rule
+def rule_hot_list(pipeline, rule):
+    selected = pipeline.screen(rule)
+    return pd.DataFrame({name: pipeline.latest(name)[selected] for name in rule_names(rule)},
+                        index=pd.Index(selected, name='Symbol'))
+
+
+# Whole screen of a universe: load constituents, load prices and pick the hot stocks
+# The hot list also gets the company names of the constituent table
+# alerts: AlertStore to record the zones of the last bar in (RSI thresholds only, not with a rule)
+def screen_universe(universe, time_window=14, low=30, high=70, period='ytd', interval='1d',
+                    store=None, refresh=True, rule=None, profiler=None, alerts=None):
+    store = PriceStore() if store is None else store
+    profiler = Profiler(enabled=False) if profiler is None else profiler
+    with profiler.stage('constituent load') as stage:
+        sp_df = load_universe(universe)
+        symbols = sp_df['Symbol'].tolist()
+        stage.rows = len(symbols)
+    with profiler.stage('price fetch') as stage:
+        data = store.load_panel(symbols, start=period_start(period), interval=interval, refresh=refresh)
+        stage.rows = len(data)
+    with profiler.stage('screening') as stage:
+        if rule:
+            hot = rule_hot_list(IndicatorPipeline.from_data(data, symbols), rule)
+        else:
+            closes = close_matrix(data, symbols)
+            _, current_rsi = compute_rsi_matrix(closes, time_window)
+            hot = hot_list(current_rsi, closes, low, high)
+            if alerts is not None and len(data):
+                alerts.record(universe, zone_table(current_rsi, closes, low, high), data.dates[-1],
+                              time_window, low, high, interval)
+        stage.rows = len(symbols)
+    names = sp_df.set_index('Symbol')[name_column(universe)]
+    hot.insert(0, 'Name', names.reindex(hot.index))
+    return hot
+
+
+# Write the hot list as CSV, JSON or Parquet (to stdout when there is no path)
+def write_hot_list(hot, path=None, fmt='csv'):
+    hot = hot.reset_index()
+    if fmt == 'csv':
+        hot.to_csv(path if path else sys.stdout, index=False)
+    elif fmt == 'json':
+        text = hot.to_json(orient='records', indent=2)
+        if path:
+            with open(path, 'w') as f:
+                f.write(text)
+        else:
+            print(text)
+    elif fmt == 'parquet':
+        if not path:
+            raise ValueError("Parquet output needs an --output file")
+        hot.to_parquet(path, index=False)
+    else:
+        raise ValueError(f"Unknown output format: {fmt}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Screen a universe of stocks for hot stocks (RSI <low or >high)")
+    parser.add_argument('--universe', default='sp100',
+                        help=f"one of {', '.join(UNIVERSES)} or a CSV/Parquet/text file with ticker symbols")
+    parser.add_argument('--window', type=int, default=14, help="RSI time window (default: 14)")
+    parser.add_argument('--low', type=float, default=30, help="oversold threshold (default: 30)")
+    parser.add_argument('--high', type=float, default=70, help="overbought threshold (default: 70)")
+    parser.add_argument('--rule', help="screening rule instead of the RSI thresholds, "
+                                       "e.g. \"rsi14 < 30 and close < bb_lower\" (see indicators.py)")
+    parser.add_argument('--period', default='ytd', help="price history to use, e.g. ytd, 1y (default: ytd)")
+    parser.add_argument('--interval', default='1d', help="bar interval (default: 1d)")
+    parser.add_argument('--output', help="output file (default: stdout)")
+    parser.add_argument('--format', choices=OUTPUT_FORMATS,
+                        help="output format (default: taken from the output file extension, else csv)")
+    parser.add_argument('--cache', help="folder of the local price store")
+    parser.add_argument('--prices', help="read prices from this CSV/Parquet file instead of Yahoo Finance")
+    parser.add_argument('--chunk-size', type=int, default=200, help="tickers per download (default: 200)")
+    parser.add_argument('--workers', type=int, default=4, help="downloads running at the same time (default: 4)")
+    parser.add_argument('--retries', type=int, default=2, help="retries of a failed download (default: 2)")
+    parser.add_argument('--pause', type=float, default=0.5,
+                        help="seconds between the start of two downloads, 0 for none (default: 0.5)")
+    parser.add_argument('--offline', action='store_true', help="only use the cached prices")
+    parser.add_argument('--record', action='store_true',
+                        help="save the zones of the last bar and log the zone changes (see alerts.py)")
+    parser.add_argument('--timings', help="write the stage timings to this file (JSON, or Prometheus text for .prom)")
+    parser.add_argument('--memory', action='store_true',
+                        help="also measure the peak memory of every stage (tracemalloc, slower)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    fmt = args.format
+    if fmt is None:
+        extension = args.output.rsplit('.', 1)[-1] if args.output and '.' in args.output else 'csv'
+        fmt = extension if extension in OUTPUT_FORMATS else 'csv'
+    store_args = {}
+    if args.cache:
+        store_args['root'] = args.cache
+    if args.prices:
+        store_args['source'] = FileSource(args.prices)
+    profiler = Profiler(enabled=bool(args.timings) or None, track_memory=args.memory or None)
+    store = PriceStore(planner=FetchPlanner(args.chunk_size, args.workers, args.retries, pause=args.pause), **store_args)
+    alerts = AlertStore(os.path.join(store.root, 'alerts')) if args.record else None
+    hot = screen_universe(args.universe, args.window, args.low, args.high, args.period,
+                          args.interval, store, refresh=not args.offline, rule=args.rule,
+                          profiler=profiler, alerts=alerts)
+    write_hot_list(hot, args.output, fmt)
+    failed = store.failed(args.interval)
+    if failed and not args.offline:
+        print(f"{len(failed)} symbols without prices (skipped): {', '.join(sorted(failed)[:20])}"
+              + (" ..." if len(failed) > 20 else ""), file=sys.stderr)
+    if args.timings:
+        profiler.save(args.timings)
+
+
+if __name__ == '__main__':
+    main()
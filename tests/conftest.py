@@ -0,0 +1,5 @@
+# The modules of the apps live in the folder above the tests
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,57 @@
+# Snapshots and zone change events of the alert store, in particular the last bar that is still
+# forming: it is recorded again whenever its values change
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from alerts import AlertStore, zone_table
+
+BAR = pd.Timestamp('2026-10-16')
+
+
+def table(rsi, close=100.0):
+    current_rsi = pd.Series(rsi, dtype=float)
+    closes = pd.DataFrame({ticker: [close] for ticker in current_rsi.index})
+    return zone_table(current_rsi, closes)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = AlertStore(str(tmp_path / 'alerts'))
+    assert store.record('sp100', table({'A': 50, 'B': 25, 'C': np.nan}), BAR).empty
+    return store
+
+
+def test_same_bar_with_changed_values_is_recorded_again(store):
+    events = store.record('sp100', table({'A': 75, 'B': 25, 'C': np.nan}), BAR)
+    assert events[['Symbol', 'Event', 'From', 'To']].values.tolist() == [['A', 'newly overbought', 'neutral', 'overbought']]
+    assert (events['Date'] == BAR).all()
+    # the zone changes back within the same bar
+    events = store.record('sp100', table({'A': 60, 'B': 25, 'C': np.nan}, close=101.0), BAR)
+    assert events[['Symbol', 'Event']].values.tolist() == [['A', 'exited']]
+    latest, meta = store.latest('sp100')
+    assert latest.loc['A', 'RSI'] == 60 and latest.loc['A', 'Close'] == 101.0
+    assert pd.Timestamp(meta['bar']) == BAR
+    assert store.events('sp100')['Event'].tolist() == ['newly overbought', 'exited']
+
+
+def test_unchanged_bar_is_not_written_again(store):
+    path = store._path('hot', 'sp100', '1d', 'parquet')
+    os.utime(path, ns=(0, 0))
+    assert store.record('sp100', table({'A': 50, 'B': 25, 'C': np.nan}), BAR).empty
+    assert os.stat(path).st_mtime_ns == 0
+    # an RSI that moves within the zone is a new snapshot but no event
+    assert store.record('sp100', table({'A': 55, 'B': 25, 'C': np.nan}), BAR).empty
+    assert os.stat(path).st_mtime_ns > 0 and store.latest('sp100')[0].loc['A', 'RSI'] == 55
+    assert store.events('sp100').empty
+
+
+def test_older_bar_is_ignored(store):
+    assert store.record('sp100', table({'A': 10, 'B': 90, 'C': np.nan}), BAR - pd.Timedelta(days=1)).empty
+    latest, meta = store.latest('sp100')
+    assert latest.loc['B', 'Zone'] == 'oversold' and pd.Timestamp(meta['bar']) == BAR
+    # the next bar is compared with the latest snapshot
+    events = store.record('sp100', table({'A': 50, 'B': 35, 'C': 20}), BAR + pd.Timedelta(days=3))
+    assert events[['Symbol', 'Event']].values.tolist() == [['B', 'exited'], ['C', 'newly oversold']]
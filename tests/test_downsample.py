@@ -0,0 +1,49 @@
+# Downsampling for the charts: LTTB keeps the shape of a series, downsample keeps its extremes
+# and every crossing of the RSI levels with a bounded number of points
+import numpy as np
+import pandas as pd
+
+from downsample import bucket_edges, crossings, downsample, lttb
+
+
+def rsi_like(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.clip(50 + np.cumsum(rng.normal(0, 2, n)), 0, 100)
+
+
+def test_lttb_keeps_first_last_and_spikes():
+    y = np.zeros(1000)
+    y[437] = 10.0
+    kept = lttb(np.arange(1000), y, 50)
+    assert len(kept) == 50 and kept[0] == 0 and kept[-1] == 999
+    assert (np.diff(kept) > 0).all()
+    assert 437 in kept
+    # nothing to reduce
+    assert list(lttb(np.arange(10), np.arange(10.0), 20)) == list(range(10))
+
+
+def test_downsample_is_bounded_and_skips_missing_values():
+    y = rsi_like(5000)
+    y[100:200] = np.nan
+    dates = pd.date_range('2026-01-02 09:30', periods=len(y), freq='1min')
+    kept = downsample(dates, y, 200, levels=(30, 70))
+    assert 200 <= len(kept) <= 3 * 200
+    assert (np.diff(kept) > 0).all() and not np.isnan(y[kept]).any()
+    assert np.nanargmin(y) in kept and np.nanargmax(y) in kept
+    # dates are handled like their nanoseconds
+    assert list(kept) == list(downsample(dates.asi8, y, 200, levels=(30, 70)))
+    # short series are kept as they are (without the missing values)
+    assert list(downsample(dates[:150], y[:150], 200)) == list(range(100))
+
+
+def test_downsample_keeps_every_level_crossing():
+    y = rsi_like(20000, seed=4)
+    n_out = 100
+    kept = downsample(np.arange(len(y)), y, n_out, levels=(30, 70))
+    edges = bucket_edges(len(y), n_out)
+    for level in (30, 70):
+        for k in crossings(y, [level]):
+            # the kept points of the bucket of the crossing lie on both sides of the level
+            bucket = min(max(np.searchsorted(edges, k, side='right') - 1, 0), len(edges) - 2)
+            shown = y[kept[(kept >= edges[bucket]) & (kept <= edges[bucket + 1])]]
+            assert shown.min() <= level <= shown.max()
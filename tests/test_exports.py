@@ -0,0 +1,60 @@
+# The exports of a snapshot as streamlit hands them to the browser: every export in every format
+# goes through the converter of st.download_button and reads back as the data it was written from
+import io
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+
+from data_service import DataService
+from exports import EXPORTS, FORMATS, export_file
+from price_store import FileSource, PriceStore
+
+TICKERS = ['A', 'B', 'C']
+
+
+@pytest.fixture(scope='module')
+def snapshot(tmp_path_factory):
+    folder = tmp_path_factory.mktemp('exports')
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range(end=pd.Timestamp.now().normalize(), periods=60, name='Date')
+    frames = []
+    for ticker in TICKERS:
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.03, len(dates))))
+        frames.append(pd.DataFrame({'Date': dates, 'Ticker': ticker, 'Open': close, 'High': close,
+                                    'Low': close, 'Close': close, 'Volume': 1000.0}))
+    pd.concat(frames).to_csv(folder / 'prices.csv', index=False)
+    (folder / 'universe.txt').write_text('\n'.join(TICKERS) + '\n')
+    service = DataService(PriceStore(str(folder / 'cache'), source=FileSource(str(folder / 'prices.csv'))),
+                          period='1y')
+    try:
+        yield service.get(str(folder / 'universe.txt'))
+    finally:
+        service.stop()
+
+
+def read_back(data, fmt):
+    if fmt == 'CSV':
+        return pd.read_csv(io.BytesIO(data))
+    if fmt == 'Parquet':
+        return pd.read_parquet(io.BytesIO(data))
+    return pa.ipc.open_file(pa.BufferReader(data)).read_all().to_pandas()
+
+
+@pytest.mark.parametrize('fmt', list(FORMATS))
+@pytest.mark.parametrize('export', EXPORTS)
+def test_export_file_is_accepted_by_download_button(snapshot, export, fmt):
+    data, _ = convert_data_to_bytes_and_infer_mime(export_file(snapshot, export, fmt, chunk_rows=50),
+                                                   ValueError('unsupported type'))
+    frame = read_back(data, fmt)
+    if export == 'prices':
+        assert len(frame) == len(snapshot.prices) * len(TICKERS)
+        assert sorted(frame['Ticker'].unique()) == TICKERS
+    elif export == 'indicators':
+        assert [f'RSI {window}' for window in snapshot.rsi_index.windows] == list(frame.columns[3:])
+    elif export == 'constituents':
+        assert frame['Symbol'].tolist() == TICKERS
+    else:
+        assert len(frame) == len(snapshot.hot)
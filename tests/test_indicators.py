@@ -0,0 +1,61 @@
+# Screening rules: evaluated element-wise on all tickers, a ticker without prices never matches
+import ast
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators import IndicatorPipeline, _evaluate
+from rsi import compute_rsi_matrix
+
+
+@pytest.fixture
+def pipeline():
+    rng = np.random.default_rng(3)
+    dates = pd.bdate_range('2026-01-02', periods=80, name='Date')
+    close = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.03, (80, 4)), axis=0)), index=dates,
+                         columns=['A', 'B', 'C', 'D'])
+    close['NOPE'] = np.nan  # a symbol without any prices
+    return IndicatorPipeline(close, close * 1.01, close * 0.99)
+
+
+def expected(pipeline, select):
+    latest = {name: pipeline.latest(name) for name in ('rsi14', 'close', 'bb_lower')}
+    return [t for t in pipeline.close.columns if select(*(latest[name][t] for name in latest))]
+
+
+def test_rsi_matches_compute_rsi_matrix(pipeline):
+    rsi, current = compute_rsi_matrix(pipeline.close, 14)
+    pd.testing.assert_frame_equal(pipeline.get('rsi14'), rsi, check_names=False)
+
+
+@pytest.mark.parametrize('rule, select', [
+    ("rsi14 < 50", lambda rsi, close, lower: rsi < 50),
+    ("rsi14 < 40 or not (close > bb_lower)", lambda rsi, close, lower: rsi < 40 or close <= lower),
+    ("not rsi14 < 50 and close > bb_lower", lambda rsi, close, lower: rsi >= 50 and close > lower),
+    ("not (rsi14 > 100)", lambda rsi, close, lower: rsi <= 100),
+    ("20 < rsi14 < 80", lambda rsi, close, lower: 20 < rsi < 80),
+])
+def test_rules_never_select_symbols_without_prices(pipeline, rule, select):
+    selected = pipeline.screen(rule)
+    assert 'NOPE' not in selected
+    assert selected == expected(pipeline, select)
+
+
+def test_rule_over_all_bars_is_boolean(pipeline):
+    result = pipeline.evaluate("not (close > bb_lower) or rsi14 > 60", over='all')
+    assert result.shape == pipeline.close.shape and (result.dtypes == bool).all()
+    assert not result['NOPE'].any()
+    # bars before the warm-up of the Bollinger Bands and the RSI are unknown, not selected
+    assert not result.iloc[:13].any().any()
+
+
+def scalar_rule(rule):
+    result = _evaluate(ast.parse(rule, mode='eval').body, None)
+    assert isinstance(result, (bool, np.bool_))
+    return result
+
+
+def test_not_on_scalars():
+    assert not scalar_rule("not (1 < 2)")
+    assert scalar_rule("not (1 > 2) and 1 < 2")
@@ -0,0 +1,93 @@
+# The intraday ring buffer and the compaction of the bars that leave it
+import threading
+
+import numpy as np
+import pandas as pd
+
+from intraday import BarRing, IntradayFeed, bucket_start, resample_bars
+from panel import FIELDS, PricePanel
+from price_store import FetchPlanner, FileSource, PriceStore
+
+
+def minute_bars(n_bars, tickers=('A', 'B'), seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(pd.Timestamp.now().normalize() - pd.Timedelta(days=1) + pd.Timedelta(hours=9, minutes=31),
+                          periods=n_bars, freq='1min', name='Date')
+    frames = []
+    for ticker in tickers:
+        close = 100 + np.cumsum(rng.normal(0, 0.5, n_bars))
+        frames.append(pd.DataFrame({'Date': dates, 'Ticker': ticker, 'Open': close + rng.normal(0, 0.1, n_bars),
+                                    'High': close + 1, 'Low': close - 1, 'Close': close,
+                                    'Volume': np.arange(1.0, n_bars + 1)}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def panel(prices, tickers=('A', 'B')):
+    return PricePanel.from_long(prices, list(tickers))
+
+
+def test_ring_evicts_oldest_bars_and_replaces_newest():
+    prices = minute_bars(8)
+    dates = prices['Date'].unique()
+    ring = BarRing(['A', 'B'], capacity=5)
+    assert ring.extend(panel(prices[prices['Date'] <= dates[2]])) is None
+    # the newest bar again (now complete) plus four new ones: two bars drop out
+    update = prices[prices['Date'] >= dates[2]].copy()
+    update.loc[update['Date'] == dates[2], 'Close'] = -1.0
+    evicted = ring.extend(panel(update[update['Date'] <= dates[6]]))
+    assert sorted(evicted['Date'].unique()) == list(dates[:2])
+    contents = ring.to_panel()
+    assert list(contents.dates) == list(dates[2:7])
+    assert (contents.arrays['Close'][0] == -1.0).all()
+    assert ring.first_time == dates[2] and ring.last_time == dates[6]
+
+
+def test_hourly_buckets_start_at_half_past():
+    quarters = pd.date_range('2026-03-02 09:30', periods=8, freq='15min')
+    prices = pd.DataFrame({'Date': quarters, 'Ticker': 'A', 'Open': 1.0, 'High': 2.0, 'Low': 0.5,
+                           'Close': np.arange(8.0), 'Volume': 1.0})
+    hours = resample_bars(prices, '1h')
+    assert list(hours['Date']) == [pd.Timestamp('2026-03-02 09:30'), pd.Timestamp('2026-03-02 10:30')]
+    assert list(hours['Close']) == [3.0, 7.0]
+    assert list(bucket_start(quarters[:2], '1h')) == [pd.Timestamp('2026-03-02 09:30')] * 2
+
+
+# A bucket of 15 minutes that is split over two refreshes is written once, complete
+def test_compacted_bars_match_resampled_minutes(tmp_path):
+    prices = minute_bars(200)
+    prices.to_csv(tmp_path / 'minutes.csv', index=False)
+    source = FileSource(str(tmp_path / 'minutes.csv'))
+    dates = prices['Date'].unique()
+    now = {'bars': 40}
+
+    def so_far(tickers, start, end, interval):
+        return source(tickers, start, dates[now['bars'] - 1] + pd.Timedelta(seconds=1), interval)
+
+    store = PriceStore(str(tmp_path / 'cache'), source=so_far, planner=FetchPlanner(pause=0))
+    feed = IntradayFeed(['A', 'B'], '1m', store, time_window=2, display_bars=10)
+    while now['bars'] < len(dates):
+        feed.refresh()
+        now['bars'] = min(now['bars'] + 7, len(dates))
+    feed.refresh()
+
+    stored = store.read('15m').drop(columns='Factor').sort_values(['Ticker', 'Date'], ignore_index=True)
+    complete = prices[bucket_start(prices['Date'], '15m') < bucket_start([feed.ring.first_time], '15m')[0]]
+    expected = resample_bars(complete, '15m').sort_values(['Ticker', 'Date'], ignore_index=True)
+    assert len(expected) > 5
+    pd.testing.assert_frame_equal(stored[['Date', 'Ticker'] + FIELDS], expected, check_dtype=False)
+
+
+def test_parallel_appends_keep_all_bars(tmp_path):
+    store = PriceStore(str(tmp_path / 'cache'))
+    prices = minute_bars(20, tickers=('A', 'B'))
+
+    def append(ticker):
+        for date, rows in prices[prices['Ticker'] == ticker].groupby('Date'):
+            store.append(rows, '15m')
+
+    threads = [threading.Thread(target=append, args=(ticker,)) for ticker in ('A', 'B')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(store.read('15m')) == len(prices)
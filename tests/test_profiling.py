@@ -0,0 +1,39 @@
+# Stage timers: the peak memory is only measured on request and tracemalloc is stopped again
+import tracemalloc
+
+from profiling import Profiler
+
+
+def run(profiler):
+    with profiler.stage('allocate', rows=3) as stage:
+        data = [0] * 100_000
+        stage.rows = len(data)
+    return profiler.records()[0]
+
+
+def test_memory_only_on_request(monkeypatch):
+    monkeypatch.setenv('HOT_STOCKS_PROFILE', '1')
+    profiler = Profiler()
+    record = run(profiler)
+    assert record['rows'] == 100_000 and record['seconds'] >= 0
+    assert record['peak_memory_bytes'] is None
+    assert 'hot_stocks_stage_peak_memory_bytes{' not in profiler.to_prometheus()
+
+
+def test_memory_from_environment_and_tracing_stops(monkeypatch):
+    monkeypatch.setenv('HOT_STOCKS_PROFILE', 'memory')
+    profiler = Profiler()
+    record = run(profiler)
+    assert profiler.enabled and record['peak_memory_bytes'] >= 100_000 * 8
+    assert not tracemalloc.is_tracing()
+    assert 'hot_stocks_stage_peak_memory_bytes{stage="allocate"}' in profiler.to_prometheus()
+
+
+def test_overlapping_stage_has_no_peak():
+    profiler = Profiler(enabled=True, track_memory=True)
+    with profiler.stage('outer'):
+        with profiler.stage('inner'):
+            pass
+    inner, outer = profiler.records()
+    assert inner['peak_memory_bytes'] is None and outer['peak_memory_bytes'] is not None
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,134 @@
+# Correctness of the RSI engine and of the prices it is computed from
+#   compute_rsi_matrix gives the same RSI as compute_rsi per ticker (also with gaps)
+#   RSIState gives the same RSI as compute_rsi after the warm-up
+#   a top-up that brings a split or a dividend gives the same prices as a cold download
+import numpy as np
+import pandas as pd
+import pytest
+
+from price_store import FileSource, PriceStore
+from rsi import RSIState, compute_rsi, compute_rsi_matrix
+
+WINDOW = 14
+
+
+def closes(n_bars=300, tickers=('A', 'B', 'C', 'D'), seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2025-01-02', periods=n_bars, name='Date')
+    values = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (n_bars, len(tickers))), axis=0))
+    frame = pd.DataFrame(values, index=dates, columns=list(tickers))
+    frame.iloc[rng.random(frame.shape) < 0.03] = np.nan  # missing bars
+    frame.iloc[:40, 1] = np.nan  # listed later
+    frame.iloc[:, 3] = frame.iloc[0, 3]  # no price changes at all
+    return frame
+
+
+def test_matrix_matches_compute_rsi():
+    frame = closes()
+    rsi, current = compute_rsi_matrix(frame, WINDOW)
+    assert rsi.shape == frame.shape
+    for ticker in frame.columns:
+        expected = compute_rsi(frame[ticker], WINDOW)
+        got = rsi[ticker].reindex(expected.index)
+        np.testing.assert_allclose(got, expected, rtol=1e-10, equal_nan=True)
+        last = expected.iloc[-1] if len(expected) else np.nan
+        np.testing.assert_allclose(current[ticker], last, rtol=1e-10, equal_nan=True)
+
+
+def test_state_matches_compute_rsi():
+    series = closes()['A']
+    expected = compute_rsi(series, WINDOW).dropna()
+    state = RSIState(WINDOW)
+    got = {}
+    for date, close in series.items():
+        rsi = state.update(close)
+        if date in expected.index:
+            got[date] = rsi
+    np.testing.assert_allclose(pd.Series(got)[expected.index], expected, rtol=1e-10)
+    assert state.rsi == pytest.approx(RSIState.from_history(series, WINDOW).rsi)
+    assert RSIState.from_dict(state.to_dict()).rsi == state.rsi
+
+
+# Prices in the long layout of the store as Yahoo Finance delivers them at the time of a
+# download: not adjusted, with the adjusted close and the corporate actions
+# Ticker S has a 2:1 split and ticker D a dividend of 1.0 on the bar `event`, N has neither
+def downloaded(n_bars, event, seed=1):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2026-01-02', periods=n_bars, name='Date')
+    frames = []
+    for ticker in ('S', 'D', 'N'):
+        close = 50 * np.exp(np.cumsum(rng.normal(0, 0.02, n_bars)))
+        adjusted = close.copy()
+        splits = np.zeros(n_bars)
+        dividends = np.zeros(n_bars)
+        if ticker == 'S' and event < n_bars:
+            close[:event] *= 2
+            splits[event] = 2.0
+        if ticker == 'D' and event < n_bars:
+            dividends[event] = 1.0
+            adjusted[:event] *= 1 - 1.0 / close[event - 1]
+        frames.append(pd.DataFrame({'Date': dates, 'Ticker': ticker, 'Open': close, 'High': close,
+                                    'Low': close, 'Close': close, 'Volume': 1.0, 'Adj Close': adjusted,
+                                    'Dividends': dividends, 'Stock Splits': splits}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_top_up_with_split_and_dividend_matches_cold_download(tmp_path):
+    n_bars, event = 120, 100
+    before = downloaded(n_bars, event)
+    before = before[before['Date'] < before['Date'].unique()[event]]
+    # the bars before the event as they were downloaded before it happened (nothing to adjust yet)
+    before['Adj Close'] = before['Close']
+    before.to_csv(tmp_path / 'before.csv', index=False)
+    downloaded(n_bars, event).to_csv(tmp_path / 'after.csv', index=False)
+    tickers = ['S', 'D', 'N']
+    start = '2026-01-01'
+
+    store = PriceStore(str(tmp_path / 'top_up'), source=FileSource(str(tmp_path / 'before.csv')), refresh_every=0)
+    store.load(tickers, start)
+    store.source = FileSource(str(tmp_path / 'after.csv'))
+    topped_up = store.load(tickers, start)
+    cold = PriceStore(str(tmp_path / 'cold'), source=FileSource(str(tmp_path / 'after.csv'))).load(tickers, start)
+
+    pd.testing.assert_frame_equal(topped_up, cold, check_exact=False, rtol=1e-12)
+    assert sorted(store.actions()) == ['D', 'S']
+    # the closes before the split are halved, the closes before the dividend scaled down
+    close = topped_up.xs('Close', axis=1, level=1)
+    raw = downloaded(n_bars, event).pivot(index='Date', columns='Ticker', values='Close')
+    assert close['S'].iloc[event - 1] == pytest.approx(raw['S'].iloc[event - 1] / 2)
+    assert close['D'].iloc[event - 1] < raw['D'].iloc[event - 1]
+    assert close['N'].to_numpy() == pytest.approx(raw['N'].to_numpy())
+
+
+# The memory-mapped panel of the data service is built from the adjusted view: after a top-up it
+# equals a cold download, and appending bars of one ticker only adjusts that ticker again
+def test_mapped_panel_after_top_up(tmp_path, monkeypatch):
+    import price_store
+
+    n_bars, event = 120, 100
+    before = downloaded(n_bars, event)
+    before = before[before['Date'] < before['Date'].unique()[event]]
+    before['Adj Close'] = before['Close']
+    before.to_csv(tmp_path / 'before.csv', index=False)
+    downloaded(n_bars, event).to_csv(tmp_path / 'after.csv', index=False)
+    tickers = ['S', 'D', 'N']
+    start = '2026-01-01'
+
+    store = PriceStore(str(tmp_path / 'top_up'), source=FileSource(str(tmp_path / 'before.csv')), refresh_every=0)
+    store.load_panel(tickers, start, mmap=True)
+    store.source = FileSource(str(tmp_path / 'after.csv'))
+    mapped = store.load_panel(tickers, start, mmap=True)
+    cold = PriceStore(str(tmp_path / 'cold'), source=FileSource(str(tmp_path / 'after.csv'))).load_panel(tickers, start)
+    for field in cold.arrays:
+        np.testing.assert_allclose(mapped.arrays[field], cold.arrays[field], rtol=1e-12)
+
+    adjusted_tickers = []
+    adjust = price_store.adjusted
+    monkeypatch.setattr(price_store, 'adjusted',
+                        lambda prices: adjusted_tickers.extend(prices['Ticker'].unique()) or adjust(prices))
+    bar = downloaded(n_bars + 1, n_bars + 1).query("Ticker == 'N'").tail(1).drop(
+        columns=['Adj Close', 'Dividends', 'Stock Splits'])
+    store.append(bar, '1d')
+    mapped = store.load_panel(tickers, start, refresh=False, mmap=True)
+    assert adjusted_tickers == ['N']
+    assert len(mapped) == n_bars + 1 and mapped.arrays['Close'][-1, 2] == bar['Close'].iloc[0]
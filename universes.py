@@ -0,0 +1,213 @@
+# Universes of stocks the Hot Stocks apps and the screener can work with
+# Either one of the index constituent tables on Wikipedia or a file with ticker symbols
+# The Wikipedia tables are snapshotted to the local cache (ConstituentStore), so the
+# slow scrape only runs when the snapshot is older than its time to live
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+from price_store import CACHE_DIR
+
+# Registry of the index universes: Wikipedia page, index of the table on that page,
+# columns with the company names and sectors and the symbols that are written differently on yfinance
+# subset_of: the universe is part of a larger one, its prices and RSI are taken from the larger one
+UNIVERSES = {
+    'sp100': {
+        'title': 'S&P 100',
+        'url': 'https://en.wikipedia.org/wiki/S%26P_100',
+        'table': 2,
+        'name_column': 'Name',
+        'sector_column': 'Sector',
+        'symbol_fixes': {'BRK.B': 'BRK-B'},
+        'subset_of': 'sp500',
+    },
+    'sp500': {
+        'title': 'S&P 500',
+        'url': 'https://en.wikipedia.org/wiki/List_of_S%26P_500_companies',
+        'table': 0,
+        'name_column': 'Security',
+        'sector_column': 'GICS Sector',
+        'symbol_fixes': {'BRK.B': 'BRK-B', 'BF.B': 'BF-B'},
+    },
+}
+
+
+# load the data through webscraping the wikipedia page of the index and use already made table
+def load_sp_data(universe):
+    info = UNIVERSES[universe]
+    html = pd.read_html(info['url'], header=0)
+    df = html[info['table']]
+    # yfinance tickers are sometimes different from the NYSE format
+    df["Symbol"] = df["Symbol"].replace(info['symbol_fixes'])
+    return df
+
+
+# Column names that are recognised in universe files (case does not matter)
+SYMBOL_COLUMNS = ['symbol', 'ticker']
+NAME_COLUMNS = ['name', 'security', 'company', 'description']
+
+
+# load a universe from a file: CSV/Parquet with a Symbol (or Ticker) column and optionally a Name
+# column, or a plain text file with one ticker symbol per line (# starts a comment)
+# Lists of thousands of symbols are fine, e.g. the holdings export of a Russell 3000 ETF: rows
+# above the header are skipped, empty and duplicate symbols are dropped
+def load_universe_file(path):
+    if path.endswith('.parquet'):
+        df = pd.read_parquet(path)
+    elif path.endswith('.csv'):
+        df = pd.read_csv(path, skiprows=_header_row(path), dtype=str)
+    else:
+        with open(path) as f:
+            lines = [line.split('#', 1)[0].strip() for line in f]
+        df = pd.DataFrame({'Symbol': [line.split()[0].strip(',') for line in lines if line]})
+    columns = {str(column).strip().lower(): column for column in df.columns}
+    symbol = next((columns[c] for c in SYMBOL_COLUMNS if c in columns), None)
+    if symbol is None:
+        raise ValueError(f"{path} has no Symbol column")
+    name = next((columns[c] for c in NAME_COLUMNS if c in columns), None)
+    df = df.rename(columns={symbol: 'Symbol', **({name: 'Name'} if name is not None else {})})
+    df["Symbol"] = df["Symbol"].astype(str).str.strip().str.upper()
+    df = df[~df["Symbol"].isin(['', '-', 'NAN', 'NONE'])].drop_duplicates('Symbol').reset_index(drop=True)
+    if 'Name' not in df.columns:
+        df['Name'] = df['Symbol']
+    return df
+
+
+# Row of the header of a CSV file (the first row that has a symbol column)
+def _header_row(path, max_rows=50):
+    with open(path, encoding='utf-8-sig') as f:
+        for row, line in zip(range(max_rows), f):
+            if any(cell.strip().strip('"').lower() in SYMBOL_COLUMNS for cell in line.split(',')):
+                return row
+    return 0
+
+
+# Local snapshots of the constituent tables
+# Every refresh that changes the table is kept as <root>/<universe>/<timestamp>.csv, so the
+# membership of a universe at any earlier point in time can be reproduced with as_of().
+# Stale snapshots are served right away while a background thread scrapes the new table.
+class ConstituentStore:
+    def __init__(self, root=os.path.join(CACHE_DIR, 'constituents'), ttl=24 * 3600, fetch=load_sp_data):
+        self.root = root
+        self.ttl = ttl
+        self.fetch = fetch
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def _folder(self, universe):
+        return os.path.join(self.root, universe)
+
+    # All snapshots of a universe as (timestamp, path), oldest first
+    def snapshots(self, universe):
+        folder = self._folder(universe)
+        if not os.path.isdir(folder):
+            return []
+        return [(pd.Timestamp(name[:-4]), os.path.join(folder, name))
+                for name in sorted(os.listdir(folder)) if name.endswith('.csv')]
+
+    def _checked_at(self, universe):
+        path = os.path.join(self._folder(universe), 'checked.json')
+        if not os.path.exists(path):
+            return 0
+        with open(path) as f:
+            return json.load(f)['checked_at']
+
+    # Scrape the table again and keep it as a new snapshot if it changed
+    def refresh(self, universe):
+        df = self.fetch(universe)
+        folder = self._folder(universe)
+        os.makedirs(folder, exist_ok=True)
+        csv = df.to_csv(index=False)
+        snapshots = self.snapshots(universe)
+        latest = None
+        if snapshots:
+            with open(snapshots[-1][1]) as f:
+                latest = f.read()
+        if csv != latest:
+            path = os.path.join(folder, pd.Timestamp.now().strftime('%Y%m%dT%H%M%S') + '.csv')
+            with open(path + '.tmp', 'w') as f:
+                f.write(csv)
+            os.replace(path + '.tmp', path)
+        with open(os.path.join(folder, 'checked.json'), 'w') as f:
+            json.dump({'checked_at': time.time()}, f)
+        return df
+
+    def _refresh_in_background(self, universe):
+        with self._lock:
+            if universe in self._refreshing:
+                return
+            self._refreshing.add(universe)
+
+        def run():
+            try:
+                self.refresh(universe)
+            except Exception:
+                pass  # offline or Wikipedia changed: keep serving the last snapshot
+            finally:
+                with self._lock:
+                    self._refreshing.discard(universe)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    # Latest constituents of a universe, scraped only if there is no snapshot yet
+    def load(self, universe):
+        snapshots = self.snapshots(universe)
+        if not snapshots:
+            self.refresh(universe)
+            snapshots = self.snapshots(universe)
+        elif time.time() - self._checked_at(universe) > self.ttl:
+            self._refresh_in_background(universe)
+        return pd.read_csv(snapshots[-1][1])
+
+    # Constituents of a universe as they were known at a point in time
+    def as_of(self, universe, date):
+        snapshots = [path for timestamp, path in self.snapshots(universe) if timestamp <= pd.Timestamp(date)]
+        if not snapshots:
+            raise ValueError(f"No snapshot of {universe} before {date}")
+        return pd.read_csv(snapshots[-1])
+
+
+constituent_store = ConstituentStore()
+
+
+# Name of the column with the company names
+def name_column(universe):
+    return UNIVERSES[universe]['name_column'] if universe in UNIVERSES else 'Name'
+
+
+# Universe whose prices and RSI are computed for a universe, e.g. the S&P 500 for the S&P 100,
+# so both are served from one download and one RSI computation (see data_service.py)
+def pipeline_universe(universe):
+    return UNIVERSES[universe].get('subset_of', universe) if universe in UNIVERSES else universe
+
+
+# Universes served by the pipeline of a universe, the universe itself first
+def pipeline_members(universe):
+    return [universe] + [name for name, info in UNIVERSES.items() if info.get('subset_of') == universe]
+
+
+# Sector of every symbol of a constituent table (Series indexed by Symbol), 'Unknown' if the
+# table has no sector column (universe files may have a Sector or GICS Sector column)
+def sectors(constituents, universe):
+    column = UNIVERSES[universe]['sector_column'] if universe in UNIVERSES else next(
+        (c for c in ['Sector', 'GICS Sector', 'sector'] if c in constituents.columns), None)
+    symbols = constituents['Symbol'].astype(str)
+    if column is None or column not in constituents.columns:
+        return pd.Series('Unknown', index=pd.Index(symbols, name='Symbol'), name='Sector')
+    return pd.Series(constituents[column].fillna('Unknown').astype(str).to_numpy(),
+                     index=pd.Index(symbols, name='Symbol'), name='Sector')
+
+
+# load the constituents of a registered index universe ('sp100', 'sp500') or of a file
+# index universes come from the local snapshots, as_of gives the constituents at an earlier date
+def load_universe(universe, as_of=None):
+    if universe in UNIVERSES:
+        if as_of is not None:
+            return constituent_store.as_of(universe, as_of)
+        return constituent_store.load(universe)
+    if os.path.exists(universe):
+        return load_universe_file(universe)
+    raise ValueError(f"Unknown universe: {universe} (use one of {', '.join(UNIVERSES)} or a file)")